@@ -0,0 +1,293 @@
+"""
+API的批量导入、导出与可用性检测。
+
+导入支持以下格式，按文件扩展名区分：
+    .json        与 api_data.json 相同的 {名称: API信息}，或API信息的列表
+    .yaml .yml   同JSON（需要安装PyYAML）
+    .csv         首行为字段名，可用英文键名或 /添加api 的中文字段名
+    其他         每行一个地址，可在地址前写名称，如 “日报 https://...”，#开头的行会被忽略
+"""
+import asyncio
+import csv
+import io
+import json
+import mimetypes
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+import data.plugins.astrbot_plugin_customize.json_decoder as json_decoder
+import data.plugins.astrbot_plugin_customize.target_path as target_path
+import data.plugins.astrbot_plugin_customize.utils as utils
+
+try:
+    import yaml
+except ImportError:  # 可选依赖
+    yaml = None
+
+API_TYPES = ("text", "image", "video", "audio", "batch")
+# 导出为CSV时的列，嵌套的设置（如prefetch）不会导出
+CSV_FIELDS = (
+    "name", "url", "type", "params", "target", "aliases", "cache_ttl", "disk_quota_mb", "rate_limit", "mirrors", "apis"
+)
+# 没有解析路径时，检测最多读取的响应体字节数（只用于测量延迟）
+PROBE_MAX_BYTES = 256 * 1024
+
+
+def _read_yaml(text: str) -> Any:
+    if yaml is None:
+        raise ValueError("导入YAML需要安装PyYAML")
+    return yaml.safe_load(text)
+
+
+def _from_mapping(data: Any) -> List[Dict[str, Any]]:
+    """把 {名称: API信息} 或API信息列表转换为列表"""
+    if isinstance(data, dict):
+        return [{"name": name, **info} for name, info in data.items() if isinstance(info, dict)]
+    if isinstance(data, list):
+        return [info for info in data if isinstance(info, dict)]
+    raise ValueError("文件内容应为 {名称: API信息} 或API信息的列表")
+
+
+def _from_csv(text: str) -> List[Dict[str, Any]]:
+    entries = []
+    for row in csv.DictReader(io.StringIO(text)):
+        info = {}
+        for key, value in row.items():
+            if not key or value is None:
+                continue
+            key = key.strip()
+            key_en = utils.API_FIELDS.get(key, key)
+            value = utils.coerce_api_field(key_en, value)
+            if value is not None:
+                info[key_en] = value
+        entries.append(info)
+    return entries
+
+
+def _from_url_list(text: str) -> List[Dict[str, Any]]:
+    entries = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        url = utils.extract_url(line)
+        if not url:
+            continue
+        name = line.split("http", 1)[0].strip()
+        if not name:
+            parsed = urlparse(url)
+            name = Path(parsed.path).stem or parsed.netloc
+        entries.append({"name": name, "url": url})
+    return entries
+
+
+def load_entries(path: Path) -> List[Dict[str, Any]]:
+    """
+    读取待导入的API。
+
+    :param path: 文件路径。
+    :return: API信息列表，尚未校验。
+    :raises ValueError: 文件格式错误。
+    """
+    text = path.read_text(encoding="utf-8-sig")
+    suffix = path.suffix.lower()
+    try:
+        if suffix == ".json":
+            return _from_mapping(json.loads(text))
+        if suffix in (".yaml", ".yml"):
+            return _from_mapping(_read_yaml(text))
+    except (json.JSONDecodeError, getattr(yaml, "YAMLError", json.JSONDecodeError)) as e:
+        raise ValueError(f"文件格式错误: {e}")
+    if suffix == ".csv":
+        return _from_csv(text)
+    return _from_url_list(text)
+
+
+def validate(info: Dict[str, Any]) -> Optional[str]:
+    """
+    校验API信息。
+
+    :return: 错误说明，合法时返回None。
+    """
+    name = info.get("name")
+    if not isinstance(name, str) or not name.strip() or any(c.isspace() for c in name):
+        return "名称为空或包含空白字符"
+    api_type = info.get("type")
+    if api_type is not None and api_type not in API_TYPES:
+        return f"类型 '{api_type}' 无效"
+    if api_type == "batch":
+        return None if info.get("apis") else "组合API缺少apis"
+    url = info.get("url")
+    if not isinstance(url, str) or urlparse(url).scheme not in ("http", "https"):
+        return "地址无效"
+    if info.get("params") is not None and not isinstance(info["params"], dict):
+        return "参数应为字典"
+    if info.get("target"):
+        try:
+            target_path.compile_path(info["target"])
+        except ValueError as e:
+            return str(e)
+    return None
+
+
+def _guess_type(content_type: str) -> str:
+    for api_type in ("image", "video", "audio"):
+        if content_type.startswith(api_type + "/"):
+            return api_type
+    return "text"
+
+
+def _guess_value_type(value: Any) -> Optional[str]:
+    """按解析路径取到的地址的扩展名推测媒体类型，无法判断时返回None"""
+    if not isinstance(value, str) or urlparse(value).scheme not in ("http", "https"):
+        return None
+    api_type = _guess_type(mimetypes.guess_type(urlparse(value).path)[0] or "")
+    return api_type if api_type != "text" else None
+
+
+class _BodyTruncated(Exception):
+    """响应体超过检测时的读取上限"""
+
+
+async def _extract_target(response: aiohttp.ClientResponse, target: str, max_bytes: int) -> Any:
+    """
+    读取响应并按解析路径取值，只由键名组成的路径会流式解析，取到后即停止读取。
+
+    :return: 取到的值，取不到时返回None。
+    :raises _BodyTruncated: 响应体超过max_bytes，无法判断能否取到值。
+    """
+    try:
+        keys = target_path.compile_path(target).key_path
+    except ValueError:
+        keys = None
+    try:
+        if json_decoder.can_stream(keys):
+            data = await json_decoder.stream_extract(response.content, keys, max_bytes, _BodyTruncated)
+        else:
+            body = bytearray()
+            async for chunk in response.content.iter_any():
+                body.extend(chunk)
+                if max_bytes and len(body) > max_bytes:
+                    raise _BodyTruncated()
+            data = json_decoder.loads(bytes(body))
+    except json_decoder.JSONDecodeError:
+        return None
+    return target_path.extract(data, target) if data is not None else None
+
+
+async def probe(
+    session: aiohttp.ClientSession, info: Dict[str, Any], timeout: float, max_bytes: int = 0
+) -> Dict[str, Any]:
+    """
+    检测一个API：是否可达、延迟、Content-Type，以及解析路径能否取到值。
+
+    :param max_bytes: 检查解析路径时最多读取的字节数，0表示不限制。
+    :return: 检测结果 {"ok", "status", "latency_ms", "content_type", "type", "target_ok", "error", "checked_at"}。
+        type为推测的API类型：没有解析路径时按Content-Type推测，有解析路径时按取到的地址推测，无法推测时不含该项。
+        响应体超过max_bytes时target_ok为None，表示未能判断。
+    """
+    result = {"ok": False, "status": 0, "latency_ms": 0, "content_type": "", "checked_at": int(time.time())}
+    params = {k: v for k, v in (info.get("params") or {}).items() if v not in (None, "")}
+    target = info.get("target")
+    value, truncated = None, False
+    start = time.monotonic()
+    try:
+        async with session.get(info["url"], params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            result["status"] = response.status
+            content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            result["content_type"] = content_type
+            if target:
+                if response.status < 400:
+                    try:
+                        value = await _extract_target(response, target, max_bytes)
+                    except _BodyTruncated:
+                        truncated = True
+            else:
+                result["type"] = _guess_type(content_type)
+                if not content_type.startswith(("image/", "video/", "audio/")):
+                    read = 0
+                    async for chunk in response.content.iter_any():
+                        read += len(chunk)
+                        if read >= PROBE_MAX_BYTES:
+                            break
+            result["latency_ms"] = int((time.monotonic() - start) * 1000)
+            if response.status >= 400:
+                result["error"] = f"HTTP {response.status}"
+                return result
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        result["latency_ms"] = int((time.monotonic() - start) * 1000)
+        result["error"] = str(e) or type(e).__name__
+        return result
+
+    result["ok"] = True
+    if target:
+        if truncated:
+            result["target_ok"] = None
+            return result
+        result["target_ok"] = value is not None
+        if value is None:
+            result["ok"] = False
+            result["error"] = "解析路径取不到值"
+        elif _guess_value_type(value):
+            result["type"] = _guess_value_type(value)
+    return result
+
+
+async def probe_all(
+    session: aiohttp.ClientSession,
+    entries: Iterable[Dict[str, Any]],
+    workers: int = 8,
+    timeout: float = 10,
+    max_bytes: int = 0,
+) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    并发检测多个API，同时进行的检测数不超过workers。组合API不检测，max_bytes见 probe。
+
+    :return: [(API信息, 检测结果)]，顺序与输入一致。
+    """
+    semaphore = asyncio.Semaphore(workers)
+
+    async def one(info: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            return await probe(session, info, timeout, max_bytes)
+
+    entries = [info for info in entries if info.get("type") != "batch"]
+    results = await asyncio.gather(*(one(info) for info in entries))
+    return list(zip(entries, results))
+
+
+def export(apis: Dict[str, Any], path: Path) -> int:
+    """
+    导出API数据，格式按扩展名选择 .json / .yaml / .csv。
+
+    :return: 导出的API数量。
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    suffix = path.suffix.lower()
+    if suffix in (".yaml", ".yml"):
+        if yaml is None:
+            raise ValueError("导出YAML需要安装PyYAML")
+        text = yaml.safe_dump(dict(apis), allow_unicode=True, sort_keys=False)
+    elif suffix == ".csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for name, info in apis.items():
+            row = {"name": name}
+            for key in CSV_FIELDS[1:]:
+                value = info.get(key)
+                if isinstance(value, dict):
+                    value = ",".join(f"{k}={v}" if v not in (None, "") else k for k, v in value.items())
+                elif isinstance(value, list):
+                    value = ",".join(str(v) for v in value if isinstance(v, str))
+                row[key] = "" if value is None else value
+            writer.writerow(row)
+        text = buffer.getvalue()
+    else:
+        text = json.dumps(dict(apis), ensure_ascii=False, indent=4)
+    path.write_text(text, encoding="utf-8")
+    return len(apis)
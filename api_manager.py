@@ -1,22 +1,54 @@
+import asyncio
 import json
+import os
+import shutil
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from types import MappingProxyType
+from typing import Dict, Any, Optional, List, Iterable, Mapping, Set, Tuple
+
+from data.plugins.astrbot_plugin_customize.target_path import compile_path
+from data.plugins.astrbot_plugin_customize.trigger_matcher import TriggerTrie
+
+# 修改API后等待这么久（秒）再写入文件，合并短时间内的多次修改
+SAVE_DELAY = 1.0
+# 一次修改的API超过这个数量时整体重建索引，而不是逐个复制索引
+INCREMENTAL_LIMIT = 8
 
 
 class APIManager:
     """
     API管理器，负责加载、添加、删除和获取API信息。
+
+    apis 与 index 采用写时复制：修改时生成新的只读字典再整体替换，
+    读取方拿到的总是完整的快照，后台保存也可以直接序列化快照。
     """
 
-    def __init__(self, api_file: Path):
+    def __init__(self, api_file: Path, default_file: Optional[Path] = None):
         """
         初始化APIManager。
 
         :param api_file: api_data.json 文件路径。
+        :param default_file: 默认API文件，api_file不存在时从此复制。
         """
         self.api_file = api_file
-        self.apis: Dict[str, Any] = self.load_apis()
+        self.default_file = default_file
+        self.apis: Mapping[str, Any] = MappingProxyType(self.load_apis())
         self.apis_names: List[str] = list(self.apis.keys())
+        self._dirty = False
+        self._save_task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self.disable_api: Set[str] = set()
+        self.disable_types: Set[str] = set()
+        # 是否停用检测结果为不可用的API
+        self.disable_dead = False
+        # API名称 -> 已启用的API信息，只收录可触发的API
+        self.index: Mapping[str, Dict[str, Any]] = {}
+        # 触发词（名称与别名）-> API名称
+        self.triggers = TriggerTrie()
+        # API名称 -> 别名，别名 -> 使用该别名的API名称，只收录已启用的API
+        self._aliases: Dict[str, List[str]] = {}
+        self._claims: Dict[str, Set[str]] = {}
+        self.rebuild_index()
 
     def load_apis(self) -> Dict[str, Any]:
         """
@@ -24,6 +56,9 @@ class APIManager:
 
         :return: 包含API数据的字典。
         """
+        if self.default_file and not self.api_file.exists() and self.default_file.exists():
+            self.api_file.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(self.default_file, self.api_file)
         try:
             with open(self.api_file, "r", encoding="utf-8") as f:
                 return json.load(f)
@@ -38,12 +73,195 @@ class APIManager:
             print(f"错误: 加载api_data.json时发生未知错误: {e}")
             return {}
 
+    def set_filters(
+        self, disable_api: Iterable[str], disable_types: Iterable[Optional[str]], disable_dead: bool = False
+    ) -> None:
+        """
+        设置禁用的API与API类型，并重建触发索引。
+
+        :param disable_api: 禁用的API名称。
+        :param disable_types: 禁用的API类型。
+        :param disable_dead: 是否停用检测结果为不可用的API。
+        """
+        self.disable_api = set(disable_api)
+        self.disable_types = {t for t in disable_types if t}
+        self.disable_dead = disable_dead
+        self.rebuild_index()
+
+    def _is_enabled(self, api_name: str, api_info: Dict[str, Any]) -> bool:
+        if self.disable_dead and (api_info.get("health") or {}).get("ok") is False:
+            return False
+        return api_name not in self.disable_api and api_info.get("type") not in self.disable_types
+
+    def _owner(self, word: str, index: Mapping[str, Any], claims: Dict[str, Set[str]]) -> Optional[str]:
+        """
+        触发词应指向的API。API名称优先于别名，已禁用API的名称也不会成为其他API的别名；
+        多个API使用同一个别名时，取API数据中靠前的。
+        """
+        if word in self.apis:
+            return word if word in index else None
+        claimed = claims.get(word)
+        if not claimed:
+            return None
+        if len(claimed) == 1:
+            return next(iter(claimed))
+        return next(name for name in self.apis if name in claimed)
+
+    def rebuild_index(self) -> None:
+        """
+        根据当前API数据和禁用设置重建触发索引。
+        """
+        index, triggers, aliases, claims = {}, TriggerTrie(), {}, {}
+        for name, info in self.apis.items():
+            if not self._is_enabled(name, info):
+                continue
+            index[name] = info
+            self._compile_targets(name, info)
+            aliases[name] = [a for a in info.get("aliases") or [] if a and a != name]
+            for alias in aliases[name]:
+                claims.setdefault(alias, set()).add(name)
+        for word in (*index, *claims):
+            owner = self._owner(word, index, claims)
+            if owner is not None:
+                triggers.insert(word, owner)
+        # 全部构建完成后再替换，读取方不会看到构建到一半的索引
+        self.index, self.triggers = MappingProxyType(index), triggers
+        self._aliases, self._claims = aliases, claims
+
+    def _update_index(self, api_name: str) -> None:
+        """
+        增量更新单个API的索引项，并按与 rebuild_index 相同的规则重新确定受影响的触发词。
+        触发词在同一次同步调用中更新，索引则复制后整体替换。
+        """
+        words = {api_name}
+        for alias in self._aliases.pop(api_name, []):
+            words.add(alias)
+            claimed = self._claims.get(alias)
+            claimed.discard(api_name)
+            if not claimed:
+                del self._claims[alias]
+        index = dict(self.index)
+        index.pop(api_name, None)
+
+        api_info = self.apis.get(api_name)
+        if api_info is not None and self._is_enabled(api_name, api_info):
+            index[api_name] = api_info
+            self._compile_targets(api_name, api_info)
+            aliases = self._aliases[api_name] = [a for a in api_info.get("aliases") or [] if a and a != api_name]
+            for alias in aliases:
+                words.add(alias)
+                self._claims.setdefault(alias, set()).add(api_name)
+        self.index = MappingProxyType(index)
+        for word in words:
+            owner = self._owner(word, index, self._claims)
+            if owner is None:
+                self.triggers.remove(word)
+            else:
+                self.triggers.insert(word, owner)
+
+    def _compile_targets(self, api_name: str, api_info: Dict[str, Any]) -> None:
+        """
+        预编译API及其镜像的解析路径，之后求值直接使用缓存的编译结果。
+        """
+        targets = [api_info.get("target")]
+        targets += [m.get("target") for m in api_info.get("mirrors") or [] if isinstance(m, dict)]
+        for target in targets:
+            if not target:
+                continue
+            try:
+                compile_path(target)
+            except ValueError as e:
+                print(f"错误: API '{api_name}' 的解析路径无效: {e}")
+
+    def match(self, text: str) -> Optional[Tuple[str, Dict[str, Any], str]]:
+        """
+        查找消息开头最长的触发词，触发词与参数之间可以没有空格。
+
+        :param text: 消息文本。
+        :return: (API名称, API信息, 剩余文本)，未命中则返回None。
+        """
+        if not text or text[0] not in self.triggers.root:
+            return None
+        found = self.triggers.longest_prefix(text, boundary=True)
+        if found is None:
+            return None
+        api_name, end = found
+        return api_name, self.index[api_name], text[end:].strip()
+
+    def resolve(self, word: str) -> Optional[str]:
+        """
+        根据名称或别名查找已启用的API。
+
+        :param word: API名称或别名。
+        :return: API名称，未找到则返回None。
+        """
+        api_name = self.triggers.get(word)
+        return api_name if api_name in self.index else None
+
     def save_apis(self) -> None:
         """
         将当前的API数据保存到 api_data.json 文件。
+        先写入临时文件再替换，写入中途出错不会损坏原文件。
+        """
+        self._write(dict(self.apis))
+
+    def _write(self, apis: Dict[str, Any]) -> None:
+        self.api_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.api_file.with_name(f".{self.api_file.name}.tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(apis, f, ensure_ascii=False, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.api_file)
+
+    def schedule_save(self) -> None:
+        """
+        在后台保存API数据，SAVE_DELAY 秒内的多次修改只写入一次。
+        没有运行中的事件循环时直接保存。
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.save_apis()
+            return
+        self._dirty = True
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._save_later())
+
+    async def _save_later(self) -> None:
+        while self._dirty:
+            try:
+                await asyncio.wait_for(self._wake.wait(), SAVE_DELAY)
+            except asyncio.TimeoutError:
+                pass
+            self._dirty = False
+            # 快照不会再被修改，可以在线程中序列化
+            snapshot = dict(self.apis)
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._write, snapshot)
+            except OSError as e:
+                print(f"错误: 保存api_data.json失败: {e}")
+
+    async def flush(self) -> None:
+        """
+        立即写入尚未保存的修改，并等待后台保存完成。
         """
-        with open(self.api_file, "w", encoding="utf-8") as f:
-            json.dump(self.apis, f, ensure_ascii=False, indent=4)
+        if self._save_task and not self._save_task.done():
+            self._wake.set()
+            await self._save_task
+            self._wake.clear()
+
+    def _set_apis(self, apis: Dict[str, Any], changed: Iterable[str]) -> None:
+        """替换API数据快照，更新变化的索引项并安排保存"""
+        changed = list(changed)
+        self.apis = MappingProxyType(apis)
+        self.apis_names = list(apis.keys())
+        if len(changed) > INCREMENTAL_LIMIT:
+            self.rebuild_index()
+        else:
+            for api_name in changed:
+                self._update_index(api_name)
+        self.schedule_save()
 
     def add_api(self, api_info: Dict[str, Any]) -> None:
         """
@@ -53,9 +271,29 @@ class APIManager:
         """
         api_name = api_info.get("name")
         if api_name:
-            self.apis[api_name] = api_info
-            self.save_apis()
-            self.apis_names = list(self.apis.keys())
+            self._set_apis({**self.apis, api_name: api_info}, [api_name])
+
+    def add_apis(self, api_infos: Iterable[Dict[str, Any]]) -> List[str]:
+        """
+        批量添加或更新API，只写入一次文件。
+
+        :param api_infos: API信息列表。
+        :return: 添加的API名称。
+        """
+        added = {info["name"]: info for info in api_infos if info.get("name")}
+        if added:
+            self._set_apis({**self.apis, **added}, added)
+        return list(added)
+
+    def set_health(self, health: Dict[str, Dict[str, Any]]) -> None:
+        """
+        记录API的检测结果（保存在API信息的health字段中），只写入一次文件。
+
+        :param health: API名称 -> 检测结果。
+        """
+        updated = {name: {**self.apis[name], "health": result} for name, result in health.items() if name in self.apis}
+        if updated:
+            self._set_apis({**self.apis, **updated}, updated)
 
     def remove_api(self, api_name: str) -> None:
         """
@@ -64,9 +302,7 @@ class APIManager:
         :param api_name: 要删除的API的名称。
         """
         if api_name in self.apis:
-            del self.apis[api_name]
-            self.save_apis()
-            self.apis_names = list(self.apis.keys())
+            self._set_apis({k: v for k, v in self.apis.items() if k != api_name}, [api_name])
 
     def get_api_info(self, api_name: str) -> Optional[Dict[str, Any]]:
         """
@@ -77,6 +313,29 @@ class APIManager:
         """
         return self.apis.get(api_name)
 
+    def get_mirrors(self, api_name: str) -> List[Dict[str, Any]]:
+        """
+        获取API的所有镜像，第一个为API本身。
+        镜像可以是其他API的名称、URL，或包含 url/params/target 的字典。
+
+        :param api_name: API的名称。
+        :return: 镜像列表，每项包含 url、params、target、type。
+        """
+        api_info = self.apis.get(api_name)
+        if not api_info:
+            return []
+        fields = ("url", "params", "target", "type")
+        mirrors = [{k: api_info.get(k) for k in fields}]
+        for mirror in api_info.get("mirrors") or []:
+            if isinstance(mirror, str):
+                mirror = self.apis.get(mirror) or ({"url": mirror} if mirror.startswith("http") else None)
+            if not isinstance(mirror, dict) or not mirror.get("url"):
+                continue
+            entry = {k: mirror.get(k) for k in fields}
+            entry["type"] = api_info.get("type")
+            mirrors.append(entry)
+        return mirrors
+
     def get_apis_names(self) -> List[str]:
         """
         获取所有API的名称列表。
@@ -0,0 +1,251 @@
+"""
+离线压测：在本地 aiohttp 模拟上游上，用伪造的消息事件驱动 match_api，
+统计各场景的吞吐（条/秒）、单条消息 p50/p99 延迟、事件循环延迟与峰值内存。
+
+模拟上游提供 JSON、文本、图片、慢响应与失败响应，不访问外网。
+需要在 AstrBot 根目录下运行（插件依赖 astrbot 包）：
+
+    python data/plugins/astrbot_plugin_customize/benchmarks/bench_load.py --messages 2000 --concurrency 50
+
+本地数据写入临时目录，运行结束后删除。
+指定多个场景时每个场景在单独的子进程中运行，峰值内存（ru_maxrss 只增不减）互不影响。
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from aiohttp import web
+
+ASTRBOT_ROOT = Path(os.path.abspath(__file__)).parents[4]
+sys.path.insert(0, str(ASTRBOT_ROOT))
+
+CJK = [chr(c) for c in range(0x4E00, 0x4E00 + 500)]
+
+
+class FakeEvent:
+    """只实现 match_api 用到的接口的 AstrMessageEvent 替身"""
+
+    def __init__(self, text: str, session: str):
+        self.text = text
+        self.unified_msg_origin = session
+        self.is_prefix = False
+        self.is_at = False
+        self.sent = 0
+
+    def get_message_str(self) -> str:
+        return self.text
+
+    def get_messages(self) -> list:
+        return []
+
+    def get_sender_name(self) -> str:
+        return "bench"
+
+    def get_self_id(self) -> str:
+        return "0"
+
+    def chain_result(self, chain):
+        return chain
+
+    def plain_result(self, text):
+        return text
+
+    async def send(self, result) -> None:
+        self.sent += 1
+
+    def stop_event(self) -> None:
+        pass
+
+
+class MockUpstream:
+    """模拟上游API"""
+
+    def __init__(self, image_kb: int, slow_seconds: float):
+        self.image_body = os.urandom(image_kb * 1024)
+        self.slow_seconds = slow_seconds
+        self.counter = 0
+        self.base = ""
+        self.runner = None
+
+    async def json(self, request: web.Request) -> web.Response:
+        return web.json_response({"code": 200, "data": {"text": "今天也要好好摸鱼", "items": list(range(50))}})
+
+    async def text(self, request: web.Request) -> web.Response:
+        return web.Response(text="疯狂星期四，V我50", content_type="text/plain")
+
+    async def media(self, request: web.Request) -> web.Response:
+        # 每次返回不同的图片地址，保证都是冷下载
+        self.counter += 1
+        return web.json_response({"data": {"url": f"{self.base}/image/{self.counter}.jpg"}})
+
+    async def image(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.image_body, content_type="image/jpeg")
+
+    async def slow(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.slow_seconds)
+        return web.json_response({"data": {"text": "slow"}})
+
+    async def fail(self, request: web.Request) -> web.Response:
+        return web.Response(status=503, text="unavailable")
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/json", self.json)
+        app.router.add_get("/text", self.text)
+        app.router.add_get("/media", self.media)
+        app.router.add_get("/image/{name}", self.image)
+        app.router.add_get("/slow", self.slow)
+        app.router.add_get("/fail", self.fail)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    async def close(self) -> None:
+        await self.runner.cleanup()
+
+
+class FakeContext:
+    def get_config(self) -> dict:
+        return {"wake_prefix": ["/"]}
+
+
+def _apis(base: str) -> dict:
+    return {
+        "笑话": {"name": "笑话", "url": f"{base}/json", "type": "text", "target": "data.text", "cache_ttl": 3600},
+        "kfc": {"name": "kfc", "url": f"{base}/text", "type": "text", "cache_ttl": 3600},
+        "随机图": {"name": "随机图", "url": f"{base}/media", "type": "image", "target": "data.url"},
+        "慢接口": {"name": "慢接口", "url": f"{base}/slow", "type": "text", "target": "data.text"},
+        "挂了": {"name": "挂了", "url": f"{base}/fail", "type": "text"},
+    }
+
+
+def _chatter(rng: random.Random) -> str:
+    return "".join(rng.choice(CJK) for _ in range(rng.randint(5, 30)))
+
+
+SCENARIOS = {
+    # 场景名 -> (说明, 生成消息的函数, 是否预热)
+    "chatter": ("普通聊天，不触发API", lambda rng: _chatter(rng), False),
+    "cache_hit": ("命中响应缓存", lambda rng: rng.choice(["笑话", "kfc"]), True),
+    "cold_media": ("冷下载图片", lambda rng: "随机图", False),
+    "slow": ("慢上游", lambda rng: "慢接口", False),
+    "outage": ("上游故障（503）", lambda rng: "挂了", False),
+}
+
+
+def _percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def _lag_monitor(samples: list, interval: float = 0.01) -> None:
+    """记录事件循环实际唤醒时间比预期晚了多久"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+async def _run_scenario(plugin_cls, api_file: Path, upstream: MockUpstream, name: str, args) -> dict:
+    _, make_message, warm = SCENARIOS[name]
+    # 从空的API数据开始，不加载自带的API（其中的预取规则会访问外网）
+    api_file.parent.mkdir(parents=True, exist_ok=True)
+    api_file.write_text("{}", encoding="utf-8")
+    plugin = plugin_cls(FakeContext(), {"timeout": args.timeout, "auto_save_data": args.save})
+    plugin.API.add_apis(_apis(upstream.base).values())
+    plugin._apply_disk_quota()
+    plugin._apply_prefetch_rules()
+
+    rng = random.Random(42)
+    messages = [make_message(rng) for _ in range(args.messages)]
+    if warm:
+        for text in set(messages):
+            await plugin.match_api(FakeEvent(text, "warmup"))
+
+    latencies, lag = [], []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int, text: str):
+        async with semaphore:
+            start = time.perf_counter()
+            await plugin.match_api(FakeEvent(text, f"group{i % 20}"))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    monitor = asyncio.create_task(_lag_monitor(lag))
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(i, text) for i, text in enumerate(messages)))
+        elapsed = time.perf_counter() - start
+    finally:
+        monitor.cancel()
+        await plugin.terminate()
+
+    return {
+        "msgs/s": len(messages) / elapsed,
+        "p50(ms)": statistics.median(latencies),
+        "p99(ms)": _percentile(latencies, 99),
+        "lag_p99(ms)": _percentile(lag, 99) * 1000 if lag else 0.0,
+        "lag_max(ms)": max(lag) * 1000 if lag else 0.0,
+        # 本进程只运行这一个场景；Linux下ru_maxrss的单位为KB
+        "peak_rss(MB)": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+async def main(args):
+    # 插件在导入时按当前目录确定数据目录，先切换到临时目录
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        from data.plugins.astrbot_plugin_customize.main import AstrbotPluginCustomize, api_file
+
+        upstream = MockUpstream(args.image_kb, args.slow)
+        await upstream.start()
+        try:
+            for name in args.scenarios:
+                result = await _run_scenario(AstrbotPluginCustomize, api_file, upstream, name, args)
+                stats = "  ".join(f"{k}={v:.2f}" for k, v in result.items())
+                print(f"{name:<11} {SCENARIOS[name][0]:<14} {stats}")
+        finally:
+            await upstream.close()
+            os.chdir(ASTRBOT_ROOT)
+
+
+def _run_isolated(args) -> None:
+    """逐个场景启动子进程运行本脚本"""
+    options = [
+        "--messages", str(args.messages),
+        "--concurrency", str(args.concurrency),
+        "--timeout", str(args.timeout),
+        "--image-kb", str(args.image_kb),
+        "--slow", str(args.slow),
+    ]
+    if args.save:
+        options.append("--save")
+    for name in args.scenarios:
+        subprocess.run([sys.executable, os.path.abspath(__file__), *options, "--scenarios", name], check=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2000, help="每个场景的消息数")
+    parser.add_argument("--concurrency", type=int, default=50, help="同时处理的消息数")
+    parser.add_argument("--timeout", type=int, default=5, help="插件的请求超时（秒）")
+    parser.add_argument("--image-kb", type=int, default=200, help="模拟图片大小（KB）")
+    parser.add_argument("--slow", type=float, default=0.2, help="慢接口的响应时间（秒）")
+    parser.add_argument("--save", action="store_true", help="开启自动保存（auto_save_data）")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    args = parser.parse_args()
+    if len(args.scenarios) > 1:
+        _run_isolated(args)
+    else:
+        asyncio.run(main(args))
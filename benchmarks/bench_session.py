@@ -0,0 +1,96 @@
+"""
+对比“每次请求新建会话”与“共享连接池会话”的握手次数与延迟。
+
+在本地启动一个 aiohttp 测试服务器，不依赖外网：
+
+    python benchmarks/bench_session.py --requests 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+from aiohttp import web
+
+
+async def _handler(request: web.Request) -> web.Response:
+    return web.json_response({"data": "ok"})
+
+
+def _trace_config(counter: dict) -> aiohttp.TraceConfig:
+    """统计新建TCP连接（握手）的次数"""
+    trace = aiohttp.TraceConfig()
+
+    async def on_create(session, ctx, params):
+        counter["handshakes"] += 1
+
+    trace.on_connection_create_end.append(on_create)
+    return trace
+
+
+def _percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def _run(url: str, total: int, concurrency: int, shared: bool) -> dict:
+    counter = {"handshakes": 0}
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    session = None
+    if shared:
+        connector = aiohttp.TCPConnector(limit=100, limit_per_host=concurrency, ttl_dns_cache=300, keepalive_timeout=30)
+        session = aiohttp.ClientSession(connector=connector, trace_configs=[_trace_config(counter)])
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            if shared:
+                async with session.get(url) as resp:
+                    await resp.json()
+            else:
+                async with aiohttp.ClientSession(trace_configs=[_trace_config(counter)]) as s:
+                    async with s.get(url) as resp:
+                        await resp.json()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    try:
+        await asyncio.gather(*(one() for _ in range(total)))
+    finally:
+        if session:
+            await session.close()
+
+    return {
+        "handshakes/req": counter["handshakes"] / total,
+        "p50(ms)": statistics.median(latencies),
+        "p99(ms)": _percentile(latencies, 99),
+    }
+
+
+async def main(total: int, concurrency: int):
+    app = web.Application()
+    app.router.add_get("/api", _handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/api"
+
+    try:
+        for label, shared in (("before: 每次新建会话", False), ("after: 共享会话", True)):
+            result = await _run(url, total, concurrency, shared)
+            stats = "  ".join(f"{k}={v:.3f}" for k, v in result.items())
+            print(f"{label:<20} {stats}")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,79 @@
+"""
+对比原 get_nested_value 与编译后的解析路径在大型嵌套JSON上的求值耗时：
+
+    python benchmarks/bench_target.py --items 10000 --rounds 20000
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from target_path import compile_path  # noqa: E402
+
+
+def legacy_get_nested_value(result: dict, target: str):
+    """原 utils.get_nested_value 的实现，作为对照"""
+    try:
+        keys = re.split(r'\.|(\[\d*\])', target)
+        keys = [k.strip("[]") for k in keys if k and k.strip()]
+        value = result
+        for key in keys:
+            if isinstance(value, list):
+                value = random.choice(value) if key == "" else value[int(key)]
+            else:
+                value = value.get(key)
+        return value
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+
+
+def _payload(items: int) -> dict:
+    return {
+        "code": 200,
+        "data": {
+            "page": {"total": items},
+            "list": [
+                {
+                    "id": i,
+                    "title": f"item {i}",
+                    "media": {"url": f"https://example.com/{i}.{'mp4' if i % 3 == 0 else 'jpg'}", "size": i * 10},
+                }
+                for i in range(items)
+            ],
+        },
+    }
+
+
+def _time(func, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) * 1e6 / rounds
+
+
+def main(items: int, rounds: int):
+    data = _payload(items)
+    print(f"列表长度: {items}, 每项重复 {rounds} 次")
+    for target in ("code", "data.list[42].media.url", "data.list[].media.url"):
+        compiled = compile_path(target)
+        legacy = _time(lambda: legacy_get_nested_value(data, target), rounds)
+        new = _time(lambda: compiled.evaluate(data), rounds)
+        print(f"{target:<32} 原实现 {legacy:8.2f} us  编译后 {new:8.2f} us")
+
+    # 原实现无法表达的路径，只测编译后的耗时
+    heavy_rounds = max(1, rounds // 1000)
+    for target in ("data.list[?media.url$=.mp4].media.url|random", "data.list[:100].title|join"):
+        compiled = compile_path(target)
+        print(f"{target:<48} 编译后 {_time(lambda: compiled.evaluate(data), heavy_rounds):10.2f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.items, args.rounds)
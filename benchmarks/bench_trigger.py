@@ -0,0 +1,63 @@
+"""
+在合成的 10k API 注册表上对比线性扫描与前缀树匹配的耗时：
+
+    python benchmarks/bench_trigger.py --apis 10000 --messages 100000
+"""
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from trigger_matcher import TriggerTrie  # noqa: E402
+
+CJK = [chr(c) for c in range(0x4E00, 0x4E00 + 500)]
+
+
+def _random_word(rng: random.Random) -> str:
+    chars = CJK if rng.random() < 0.7 else string.ascii_lowercase
+    return "".join(rng.choice(chars) for _ in range(rng.randint(2, 6)))
+
+
+def _linear(names: list, text: str):
+    first = text.split(" ")[0]
+    return next((i for i in names if i == first), None)
+
+
+def main(num_apis: int, num_messages: int):
+    rng = random.Random(42)
+    names = list({_random_word(rng) for _ in range(num_apis)})
+    trie = TriggerTrie((name, name) for name in names)
+
+    messages = []
+    for _ in range(num_messages):
+        roll = rng.random()
+        if roll < 0.9:  # 普通聊天
+            messages.append("".join(rng.choice(CJK) for _ in range(rng.randint(5, 30))))
+        elif roll < 0.95:  # 带空格的触发
+            messages.append(f"{rng.choice(names)} 参数")
+        else:  # 不带空格的触发
+            messages.append(f"{rng.choice(names)}参数")
+
+    start = time.perf_counter()
+    linear_hits = sum(1 for m in messages if _linear(names, m))
+    linear_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    trie_hits = sum(1 for m in messages if trie.longest_prefix(m, boundary=True))
+    trie_time = time.perf_counter() - start
+
+    print(f"注册表: {len(names)} 个API, 消息: {num_messages} 条")
+    print(f"线性扫描: {linear_time * 1e6 / num_messages:8.2f} us/条  命中 {linear_hits}")
+    print(f"前缀树:   {trie_time * 1e6 / num_messages:8.2f} us/条  命中 {trie_hits}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--apis", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=100000)
+    args = parser.parse_args()
+    main(args.apis, args.messages)
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+try:
+    import xxhash
+except ImportError:  # 可选依赖
+    xxhash = None
+
+try:
+    from PIL import Image
+except ImportError:  # 可选依赖
+    Image = None
+
+
+def new_hasher():
+    """内容哈希：安装了 xxhash 时使用 xxh3_128，否则使用 blake2b（均比md5快）"""
+    return xxhash.xxh3_128() if xxhash else hashlib.blake2b(digest_size=16)
+
+
+def dhash(path: Path) -> Optional[int]:
+    """计算图片的64位差值哈希（dHash），未安装Pillow或无法解码时返回None"""
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as img:
+            img.draft("L", (64, 64))  # JPEG可直接按缩小尺寸解码
+            pixels = list(img.convert("L").resize((9, 8)).getdata())
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = value << 1 | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+class BlobStore:
+    """
+    全局的内容寻址媒体存储，文件按内容哈希保存一份，各API目录中只放指向它的硬链接。
+    不支持硬链接的文件系统不去重，文件直接保存在各API目录中。没有任何API引用（链接数为1）的文件会在gc时删除。
+    """
+
+    def __init__(self, root: Path, phash_distance: int = 0):
+        """
+        初始化BlobStore。
+
+        :param root: 存储目录。
+        :param phash_distance: 图片感知哈希的汉明距离阈值，新图片与已有图片的距离不超过该值时视为重复，0为不检测。
+        """
+        self.root = root
+        self.phash_distance = phash_distance
+        self._lock = threading.Lock()
+        # 类型 -> {文件名: 感知哈希}
+        self._phashes: Dict[str, Dict[str, int]] = {}
+        self._dirty = set()
+        # 文件系统是否支持硬链接，首次链接失败后置为False
+        self.hardlinks = True
+
+    def _blob_path(self, digest: str, data_type: str, extension: str) -> Path:
+        return self.root / data_type / digest[:2] / f"{digest}{extension}"
+
+    def _phash_file(self, data_type: str) -> Path:
+        return self.root / f".{data_type}.phash.json"
+
+    def _phash_index(self, data_type: str) -> Dict[str, int]:
+        index = self._phashes.get(data_type)
+        if index is None:
+            try:
+                index = json.loads(self._phash_file(data_type).read_text("utf-8"))
+            except (FileNotFoundError, json.JSONDecodeError, OSError):
+                index = {}
+            self._phashes[data_type] = index
+        return index
+
+    def _near_duplicate(self, data_type: str, value: int) -> Optional[Path]:
+        """在已有图片中查找感知哈希足够接近的一个，需要持有锁"""
+        index = self._phash_index(data_type)
+        for name, other in list(index.items()):
+            if (value ^ other).bit_count() <= self.phash_distance:
+                path = self._blob_path(Path(name).stem, data_type, Path(name).suffix)
+                if path.exists():
+                    return path
+                del index[name]
+                self._dirty.add(data_type)
+        return None
+
+    def _link(self, blob: Path, dest_dir: Path, created: bool) -> Path:
+        """
+        在dest_dir中建立指向blob的硬链接，需要持有锁。
+        文件系统不支持硬链接时，本次新保存的文件直接移入dest_dir，不留在存储中，否则复制一份；
+        之后的文件不再经过存储，以免没有链接的文件在gc时被当作无人引用。
+        """
+        dest = dest_dir / blob.name
+        if dest.exists():
+            return dest
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(blob, dest)
+        except FileExistsError:
+            pass
+        except OSError:
+            self.hardlinks = False
+            if created:
+                os.replace(blob, dest)
+            else:
+                shutil.copyfile(blob, dest)
+        return dest
+
+    def store_file(self, tmp_path: Path, digest: str, data_type: str, extension: str, dest_dir: Path) -> Path:
+        """
+        把已写完的临时文件放入存储，并在dest_dir中建立引用。
+        内容已存在（或是相近的图片）时不再保存，临时文件由调用方删除。
+
+        :return: dest_dir中的文件路径。
+        """
+        if not self.hardlinks:
+            dest = dest_dir / f"{digest}{extension}"
+            if not dest.exists():
+                dest_dir.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, dest)
+            return dest
+        blob = self._blob_path(digest, data_type, extension)
+        value = None
+        if self.phash_distance and data_type == "image" and not blob.exists():
+            value = dhash(tmp_path)
+        with self._lock:
+            created = False
+            if not blob.exists():
+                near = self._near_duplicate(data_type, value) if value is not None else None
+                if near is not None:
+                    blob = near
+                else:
+                    blob.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(tmp_path, blob)
+                    created = True
+            dest = self._link(blob, dest_dir, created)
+            if created and value is not None and blob.exists():
+                self._phash_index(data_type)[blob.name] = value
+                self._dirty.add(data_type)
+            return dest
+
+    def store_bytes(self, data: bytes, data_type: str, extension: str, dest_dir: Path) -> Path:
+        """保存内存中的数据，见 store_file"""
+        hasher = new_hasher()
+        hasher.update(data)
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.root / f".{uuid.uuid4().hex}.part"
+        try:
+            tmp_path.write_bytes(data)
+            return self.store_file(tmp_path, hasher.hexdigest(), data_type, extension, dest_dir)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def _iter_blobs(self):
+        if not self.root.is_dir():
+            return
+        for type_dir in self.root.iterdir():
+            if not type_dir.is_dir():
+                continue
+            for bucket in type_dir.iterdir():
+                if not bucket.is_dir():
+                    continue
+                with os.scandir(bucket) as it:
+                    for item in it:
+                        if item.is_file() and not item.name.startswith("."):
+                            yield type_dir.name, item
+
+    def gc(self) -> int:
+        """删除不再被任何API引用的文件，返回释放的字节数"""
+        freed = 0
+        with self._lock:
+            for data_type, item in self._iter_blobs():
+                stat = item.stat()
+                if stat.st_nlink > 1:
+                    continue
+                Path(item.path).unlink(missing_ok=True)
+                freed += stat.st_size
+                if self._phash_index(data_type).pop(item.name, None) is not None:
+                    self._dirty.add(data_type)
+        return freed
+
+    def usage(self) -> Tuple[int, int]:
+        """存储中的 (文件数, 字节数)，即去重后的实际占用"""
+        count = size = 0
+        for _, item in self._iter_blobs():
+            count += 1
+            size += item.stat().st_size
+        return count, size
+
+    def flush(self) -> None:
+        """保存有变化的感知哈希索引"""
+        with self._lock:
+            for data_type in self._dirty:
+                path = self._phash_file(data_type)
+                tmp_path = path.with_suffix(".tmp")
+                tmp_path.write_text(json.dumps(self._phashes[data_type]), "utf-8")
+                os.replace(tmp_path, path)
+            self._dirty.clear()
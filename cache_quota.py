@@ -0,0 +1,96 @@
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+# (类型, API名称, 文件名, 大小, 最近使用时间, 使用次数, 文件标识)
+# 文件标识相同的记录是同一个文件的多个硬链接，磁盘上只占一份空间
+Record = Tuple[str, str, str, int, float, int, Hashable]
+
+
+class CacheQuota:
+    """
+    磁盘缓存配额与淘汰策略，支持全局、按类型和按API的字节上限。
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 0,
+        type_bytes: Optional[Dict[str, int]] = None,
+        api_bytes: Optional[Dict[str, int]] = None,
+        policy: str = "lru",
+    ):
+        """
+        初始化CacheQuota，上限为0表示不限制。
+
+        :param max_bytes: 全局字节上限。
+        :param type_bytes: 类型 -> 字节上限。
+        :param api_bytes: API名称 -> 字节上限。
+        :param policy: 淘汰策略，lru 淘汰最久未使用的，lfu 淘汰使用次数最少的。
+        """
+        self.max_bytes = max_bytes
+        self.type_bytes = {k: v for k, v in (type_bytes or {}).items() if v}
+        self.api_bytes = {k: v for k, v in (api_bytes or {}).items() if v}
+        self.policy = policy
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_bytes or self.type_bytes or self.api_bytes)
+
+    def _sort_key(self, record: Record):
+        if self.policy == "lfu":
+            return record[5], record[4]
+        return record[4], record[5]
+
+    def _group_key(self, group: List[Record]):
+        """共享文件按所有引用中最近的使用时间、合计的使用次数排序"""
+        last_used, hits = max(r[4] for r in group), sum(r[5] for r in group)
+        if self.policy == "lfu":
+            return hits, last_used
+        return last_used, hits
+
+    def _evict_over(self, records: Iterable[Record], limit: int, victims: Dict[tuple, Record]) -> None:
+        """
+        从records中按策略挑选文件，直到未淘汰部分的实际占用不超过limit。
+        共享同一文件的记录只计一次大小，并且一起淘汰，否则删掉其中一个引用并不会释放空间。
+        """
+        groups: Dict[Hashable, List[Record]] = defaultdict(list)
+        for record in records:
+            if record[:3] not in victims:
+                groups[record[6]].append(record)
+        used = sum(group[0][3] for group in groups.values())
+        if used <= limit:
+            return
+        for group in sorted(groups.values(), key=self._group_key):
+            for record in group:
+                victims[record[:3]] = record
+            used -= group[0][3]
+            if used <= limit:
+                return
+
+    def plan(self, records: List[Record], batch: int = 0) -> List[Record]:
+        """
+        计算需要淘汰的文件。
+
+        :param records: 当前所有缓存文件。按API的上限统计各自引用的大小，按类型和全局的上限统计去重后的实际占用。
+        :param batch: 单次最多淘汰的文件数，0表示不限制。
+        :return: 需要淘汰的文件。
+        """
+        victims: Dict[tuple, Record] = {}
+        by_api: Dict[Tuple[str, str], List[Record]] = defaultdict(list)
+        by_type: Dict[str, List[Record]] = defaultdict(list)
+        for record in records:
+            by_api[record[:2]].append(record)
+            by_type[record[0]].append(record)
+
+        for (_, api_name), api_records in by_api.items():
+            limit = self.api_bytes.get(api_name)
+            if limit:
+                self._evict_over(api_records, limit, victims)
+        for data_type, type_records in by_type.items():
+            limit = self.type_bytes.get(data_type)
+            if limit:
+                self._evict_over(type_records, limit, victims)
+        if self.max_bytes:
+            self._evict_over(records, self.max_bytes, victims)
+
+        planned = sorted(victims.values(), key=self._sort_key)
+        return planned[:batch] if batch else planned
@@ -0,0 +1,174 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STATE_NAMES = {CLOSED: "正常", OPEN: "熔断", HALF_OPEN: "探测中"}
+
+# 熔断后探测间隔的最大倍数
+MAX_BACKOFF = 8
+
+
+class Breaker:
+    """
+    单个API或域名的熔断器，在最近N次请求的滑动窗口内统计成功率与延迟。
+    """
+
+    def __init__(self, window: int, min_calls: int, failure_ratio: float):
+        self.window: Deque[Tuple[bool, float]] = deque(maxlen=window)
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.state = CLOSED
+        self.opened_times = 0
+        # 用于后台探测的请求，优先使用最近一次成功的请求，避免一直探测已失效的地址
+        self.probe_target: Optional[Tuple[str, Optional[dict]]] = None
+
+    def record(self, ok: bool, latency: float) -> bool:
+        """
+        记录一次请求结果。
+
+        :return: 本次记录是否使熔断器打开。
+        """
+        self.window.append((ok, latency))
+        if self.state != CLOSED or len(self.window) < self.min_calls:
+            return False
+        if self.error_rate() >= self.failure_ratio:
+            self.state = OPEN
+            self.opened_times += 1
+            return True
+        return False
+
+    def reset(self) -> None:
+        self.window.clear()
+        self.state = CLOSED
+        self.opened_times = 0
+
+    def error_rate(self) -> float:
+        if not self.window:
+            return 0.0
+        return sum(1 for ok, _ in self.window if not ok) / len(self.window)
+
+    def avg_latency(self) -> float:
+        latencies = [latency for ok, latency in self.window if ok]
+        return sum(latencies) / len(latencies) if latencies else 0.0
+
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        latencies = sorted(latency for ok, latency in self.window if ok)
+        if len(latencies) < self.min_calls:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))]
+
+
+class CircuitBreakers:
+    """
+    按API和按域名的熔断器集合。熔断期间请求直接走本地缓存，
+    并在后台定期用半开探测检查上游是否恢复。
+    """
+
+    def __init__(
+        self,
+        probe: Callable[[str, Optional[dict]], Awaitable[bool]],
+        window: int = 20,
+        min_calls: int = 5,
+        failure_ratio: float = 0.5,
+        open_seconds: float = 30,
+    ):
+        """
+        初始化CircuitBreakers。
+
+        :param probe: 探测函数，参数为 (url, params)，上游可用时返回True。
+        :param window: 滑动窗口内的请求数。
+        :param min_calls: 窗口内至少有这么多次请求才会判断是否熔断。
+        :param failure_ratio: 窗口内失败比例达到该值时熔断。
+        :param open_seconds: 熔断后首次探测前等待的秒数，之后连续失败会加倍。
+        """
+        self.probe = probe
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.open_seconds = open_seconds
+        self._breakers: Dict[str, Breaker] = {}
+        self._probes: Set[asyncio.Task] = set()
+
+    def _get(self, key: str) -> Breaker:
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = Breaker(self.window, self.min_calls, self.failure_ratio)
+        return breaker
+
+    def allow(self, key: str) -> bool:
+        """熔断器未打开时返回True"""
+        breaker = self._breakers.get(key)
+        return breaker is None or breaker.state == CLOSED
+
+    def record(self, key: str, ok: bool, latency: float, url: str, params: Optional[dict] = None) -> None:
+        """
+        记录一次上游请求结果，达到阈值时打开熔断器并启动后台探测。
+
+        :param key: 熔断器名称，如 "api:日报" 或 "host:dayu.qqsuu.cn"。
+        :param ok: 请求是否成功。
+        :param latency: 请求耗时（秒）。
+        :param url: 请求地址，成功时（或还没有成功记录时）用于后台探测。
+        :param params: 请求参数，用于后台探测。
+        """
+        breaker = self._get(key)
+        if ok or breaker.probe_target is None:
+            breaker.probe_target = (url, params)
+        if breaker.record(ok, latency):
+            task = asyncio.create_task(self._probe_loop(key, breaker))
+            self._probes.add(task)
+            task.add_done_callback(self._probes.discard)
+
+    async def _probe_loop(self, key: str, breaker: Breaker) -> None:
+        while breaker.state != CLOSED:
+            backoff = min(2 ** (breaker.opened_times - 1), MAX_BACKOFF)
+            await asyncio.sleep(self.open_seconds * backoff)
+            breaker.state = HALF_OPEN
+            url, params = breaker.probe_target
+            start = time.monotonic()
+            try:
+                ok = await self.probe(url, params)
+            except Exception:
+                ok = False
+            if ok:
+                breaker.reset()
+                breaker.window.append((True, time.monotonic() - start))
+            else:
+                breaker.state = OPEN
+                breaker.opened_times += 1
+
+    def latency(self, key: str, pct: float) -> Optional[float]:
+        """
+        获取成功请求延迟的百分位数。
+
+        :return: 延迟（秒），样本不足时返回None。
+        """
+        breaker = self._breakers.get(key)
+        return breaker.latency_percentile(pct) if breaker else None
+
+    def health(self, key: str) -> Optional[Dict[str, float]]:
+        """
+        获取熔断器的健康状态。
+
+        :return: {"state", "error_rate", "latency", "calls"}，没有记录时返回None。
+        """
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            return None
+        return {
+            "state": breaker.state,
+            "error_rate": breaker.error_rate(),
+            "latency": breaker.avg_latency(),
+            "calls": len(breaker.window),
+        }
+
+    async def close(self) -> None:
+        """取消所有后台探测"""
+        for task in list(self._probes):
+            task.cancel()
+        if self._probes:
+            await asyncio.gather(*self._probes, return_exceptions=True)
@@ -1,12 +1,23 @@
-import json
-import random
-import hashlib
+import asyncio
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, List, Optional, Union
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
 
 import astrbot.api.message_components as Comp
+from astrbot.api import logger
 from astrbot.core.message.components import BaseMessageComponent
 
+from data.plugins.astrbot_plugin_customize.blob_store import BlobStore, new_hasher
+from data.plugins.astrbot_plugin_customize.cache_quota import CacheQuota, Record
+from data.plugins.astrbot_plugin_customize.media_manifest import MediaManifest
+from data.plugins.astrbot_plugin_customize.metrics import Metrics
+from data.plugins.astrbot_plugin_customize.text_store import TextStore
+
 # 定义缓存路径
 DATA_PATH = Path("./data/plugins_data/astrbot_plugin_customize")
 DATA_PATH.mkdir(parents=True, exist_ok=True)
@@ -18,8 +29,245 @@ TYPE_DIRS = {
     "video": DATA_PATH / "video",
     "audio": DATA_PATH / "audio",
 }
+# 未开启自动保存时，下载的媒体文件临时存放于此，插件启动时清空
+TMP_DIR = DATA_PATH / "tmp"
+# 去重后的媒体文件，各API目录中是指向这里的硬链接
+BLOB_DIR = DATA_PATH / "blobs"
+
+MEDIA_EXTENSIONS = {"image": ".jpg", "audio": ".mp3", "video": ".mp4"}
+# 保存新文件后，等待这么久再检查配额，合并短时间内的多次保存
+TRIM_DELAY = 5
+# 每轮最多淘汰的文件数，每轮之间让出事件循环
+TRIM_BATCH = 100
+# 临时目录中超过这个时间（秒）的文件会在清理时删除
+TMP_MAX_AGE = 600
+
+
+class BodyTooLargeError(Exception):
+    """响应体超过允许的最大字节数"""
+
 
 class DataManager:
+    """
+    本地数据管理器，所有文件读写与哈希计算都在专用线程池中执行，不阻塞事件循环。
+    """
+
+    def __init__(
+        self, max_workers: int = 4, max_pending: int = 64, metrics: Optional[Metrics] = None, phash_distance: int = 0
+    ):
+        """
+        初始化DataManager。
+
+        :param max_workers: 磁盘IO线程数。
+        :param max_pending: 同时排队的IO任务上限，超出时后台保存会被丢弃，读取会等待。
+        :param metrics: 运行指标，用于记录保存耗时。
+        :param phash_distance: 图片去重的感知哈希距离阈值，0为只去除完全相同的文件。
+        """
+        self.metrics = metrics
+        self.blobs = BlobStore(BLOB_DIR, phash_distance)
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="customize-io")
+        self._io_slots = asyncio.Semaphore(max_pending)
+        self._max_pending = max_pending
+        self._background: Set[asyncio.Task] = set()
+        self._text_stores: Dict[str, TextStore] = {}
+        self._manifests: Dict[Tuple[str, str], MediaManifest] = {}
+        self._stores_lock = threading.Lock()
+        self.quota = CacheQuota()
+        self._trim_task: Optional[asyncio.Task] = None
+
+    async def _run(self, func: Callable, *args) -> Any:
+        """在IO线程池中执行同步函数"""
+        async with self._io_slots:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def text_store(self, path_name: str) -> TextStore:
+        """获取文本API的历史记录，旧版 .json 记录会在首次访问时迁移为 .jsonl"""
+        with self._stores_lock:
+            store = self._text_stores.get(path_name)
+            if store is None:
+                store = TextStore(TYPE_DIRS["text"] / f"{path_name}.jsonl")
+                self._text_stores[path_name] = store
+            return store
+
+    def manifest(self, path_name: str, data_type: str) -> MediaManifest:
+        """获取媒体API缓存目录的文件清单"""
+        with self._stores_lock:
+            manifest = self._manifests.get((data_type, path_name))
+            if manifest is None:
+                manifest = MediaManifest(TYPE_DIRS[data_type] / path_name)
+                self._manifests[(data_type, path_name)] = manifest
+            return manifest
+
+    def _flush_manifests(self) -> None:
+        for manifest in list(self._manifests.values()):
+            manifest.flush()
+        self.blobs.flush()
+
+    def _media_dirs(self) -> List[Tuple[str, str]]:
+        """列出所有媒体缓存目录 (类型, API名称)"""
+        found = set()
+        for data_type, type_dir in TYPE_DIRS.items():
+            if data_type == "text" or not type_dir.is_dir():
+                continue
+            with os.scandir(type_dir) as it:
+                for item in it:
+                    if item.is_dir() and not item.name.startswith("."):
+                        found.add((data_type, item.name))
+        return sorted(found)
+
+    def _collect_records(self) -> List[Record]:
+        """
+        列出所有媒体缓存文件，硬链接到同一文件的记录有相同的文件标识 (设备号, inode)。
+        文件标识在保存时记入清单，只有旧版清单中的记录需要读取一次文件信息。
+        """
+        records = []
+        for data_type, path_name in self._media_dirs():
+            manifest = self.manifest(path_name, data_type)
+            for name, size, last_used, hits, file_id in manifest.entries():
+                if file_id is None:
+                    try:
+                        stat = os.stat(manifest.directory / name)
+                    except FileNotFoundError:
+                        manifest.remove(name)
+                        continue
+                    file_id = (stat.st_dev, stat.st_ino)
+                    manifest.set_file_id(name, file_id)
+                records.append((data_type, path_name, name, size, last_used, hits, file_id))
+        return records
+
+    def _add_to_manifest(self, path_name: str, data_type: str, save_path: Path) -> None:
+        stat = save_path.stat()
+        self.manifest(path_name, data_type).add(save_path.name, stat.st_size, (stat.st_dev, stat.st_ino))
+
+    def _clean_tmp(self) -> int:
+        """删除临时目录中过期的文件，返回释放的字节数"""
+        freed = 0
+        if not TMP_DIR.is_dir():
+            return freed
+        deadline = time.time() - TMP_MAX_AGE
+        with os.scandir(TMP_DIR) as it:
+            for item in it:
+                stat = item.stat()
+                if item.is_file() and stat.st_mtime < deadline:
+                    Path(item.path).unlink(missing_ok=True)
+                    freed += stat.st_size
+        return freed
+
+    def _trim_step(self, batch: int, quota: CacheQuota) -> Tuple[int, int]:
+        """按配额淘汰一批文件，返回 (文件数, 字节数)"""
+        if not quota.enabled:
+            return 0, 0
+        victims = quota.plan(self._collect_records(), batch)
+        freed = 0
+        for data_type, path_name, name, *_ in victims:
+            freed += self.manifest(path_name, data_type).evict(name)
+        return len(victims), freed
+
+    async def trim(self, quota: Optional[CacheQuota] = None, batch: int = TRIM_BATCH) -> Tuple[int, int]:
+        """
+        分批淘汰超出配额的缓存文件，每批之间让出事件循环。
+
+        :param quota: 本次使用的配额，默认使用已配置的配额。
+        :param batch: 每批最多淘汰的文件数。
+        :return: (淘汰的文件数, 释放的字节数)
+        """
+        quota = quota or self.quota
+        total_files, total_bytes = 0, await self._run(self._clean_tmp)
+        while True:
+            files, freed = await self._run(self._trim_step, batch, quota)
+            total_files += files
+            total_bytes += freed
+            if files < batch:
+                break
+            await asyncio.sleep(0.1)
+        if total_files:
+            # 共享文件的所有引用都被淘汰后才真正删除，释放的空间以gc实际删除的为准
+            total_bytes += await self._run(self.blobs.gc)
+            await self._run(self._flush_manifests)
+            logger.info(f"缓存清理完成，删除 {total_files} 个文件，释放 {total_bytes / 1024 / 1024:.1f}MB")
+        return total_files, total_bytes
+
+    def request_trim(self) -> None:
+        """在后台延迟检查配额，短时间内的多次请求只会触发一次清理"""
+        if self._trim_task and not self._trim_task.done():
+            return
+        self._trim_task = asyncio.create_task(self._delayed_trim())
+
+    async def _delayed_trim(self) -> None:
+        await asyncio.sleep(TRIM_DELAY)
+        try:
+            await self.trim()
+        except Exception as e:
+            logger.error(f"缓存清理失败: {e}")
+
+    async def usage(self) -> Dict[str, Any]:
+        """
+        统计本地缓存占用。
+
+        :return: {"total": 字节数, "types": {类型: [文件数, 字节数]}, "apis": {(类型, API): [文件数, 字节数]},
+            "blobs": (去重后的文件数, 字节数)}。total与types按去重后的实际占用统计，apis按各API引用的文件统计
+        """
+        def collect():
+            types: Dict[str, list] = {t: [0, 0] for t in TYPE_DIRS}
+            apis: Dict[Tuple[str, str], list] = {}
+            seen = set()
+            for data_type, path_name, _, size, _, _, file_id in self._collect_records():
+                bucket = apis.setdefault((data_type, path_name), [0, 0])
+                bucket[0] += 1
+                bucket[1] += size
+                if file_id not in seen:
+                    seen.add(file_id)
+                    types[data_type][0] += 1
+                    types[data_type][1] += size
+            text_dir = TYPE_DIRS["text"]
+            if text_dir.is_dir():
+                for p in text_dir.glob("*.jsonl"):
+                    types["text"][0] += 1
+                    types["text"][1] += p.stat().st_size
+            return {
+                "total": sum(v[1] for v in types.values()),
+                "types": types,
+                "apis": apis,
+                "blobs": self.blobs.usage(),
+            }
+
+        return await self._run(collect)
+
+    async def compact_text(self, path_name: Optional[str] = None) -> None:
+        """压缩文本历史记录，未指定名称时压缩全部"""
+        if path_name:
+            names = [path_name]
+        else:
+            names = await self._run(
+                lambda: sorted({p.stem for p in TYPE_DIRS["text"].glob("*.json*") if p.suffix in (".json", ".jsonl")})
+            )
+        for name in names:
+            await self._run(self.text_store(name).compact)
+
+    def schedule_save(self, data: Union[str, bytes], path_name: str, data_type: str) -> None:
+        """在后台保存数据，不等待写入完成；排队任务过多时直接丢弃本次保存"""
+        if len(self._background) >= self._max_pending:
+            logger.warning(f"本地保存任务积压，跳过保存: {path_name}")
+            return
+        task = asyncio.create_task(self.save_data(data, path_name, data_type))
+        self._background.add(task)
+        task.add_done_callback(self._on_background_done)
+
+    def _on_background_done(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"本地保存失败: {task.exception()}")
+
+    async def close(self) -> None:
+        """等待后台保存完成并关闭线程池"""
+        if self._trim_task:
+            self._trim_task.cancel()
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        await self._run(self._flush_manifests)
+        self._executor.shutdown(wait=False)
+
     def build_chain(self, data: Any, data_type: str, from_local: bool = False) -> List[BaseMessageComponent]:
         """构建消息链"""
         if data is None:
@@ -41,49 +289,104 @@ class DataManager:
 
     async def save_data(self, data: Union[str, bytes], path_name: str, data_type: str):
         """将数据保存到本地"""
+        start = time.monotonic()
+        await self._run(self._save_data_sync, data, path_name, data_type)
+        if self.metrics:
+            self.metrics.observe("save", time.monotonic() - start)
+        if data_type != "text":
+            self.request_trim()
+
+    def _save_data_sync(self, data: Union[str, bytes], path_name: str, data_type: str):
         TYPE_DIR = TYPE_DIRS.get(data_type)
         if not TYPE_DIR: return
         TYPE_DIR.mkdir(parents=True, exist_ok=True)
 
         if data_type == "text":
-            json_path = TYPE_DIR / f"{path_name}.json"
-            try:
-                history = json.loads(json_path.read_text("utf-8")) if json_path.exists() else []
-            except json.JSONDecodeError:
-                history = []
-            
-            clean_text = str(data).replace("\r", "\n")
-            if clean_text not in history:
-                history.append(clean_text)
-                json_path.write_text(json.dumps(history, ensure_ascii=False, indent=4), "utf-8")
+            self.text_store(path_name).append(str(data).replace("\r", "\n"))
         elif isinstance(data, bytes):
-            save_dir = TYPE_DIR / path_name
-            save_dir.mkdir(parents=True, exist_ok=True)
-            
-            file_hash = hashlib.md5(data).hexdigest()
-            extension = { "image": ".jpg", "audio": ".mp3", "video": ".mp4"}.get(data_type, ".dat")
-            save_path = save_dir / f"{file_hash}{extension}"
-            
-            if not save_path.exists():
-                save_path.write_bytes(data)
-
-    async def get_data(self, path_name: str, data_type: str) -> Optional[List[BaseMessageComponent]]:
-        """从本地取出数据"""
+            extension = MEDIA_EXTENSIONS.get(data_type, ".dat")
+            save_path = self.blobs.store_bytes(data, data_type, extension, TYPE_DIR / path_name)
+            self._add_to_manifest(path_name, data_type, save_path)
+
+    async def save_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        path_name: str,
+        data_type: str,
+        max_bytes: int = 0,
+        persist: bool = True,
+    ) -> Optional[Path]:
+        """
+        边下载边写入临时文件并增量计算哈希，完成后原子地移动到以哈希命名的位置。
+        persist为True时文件放入去重存储，API目录中只保存引用。
+        超过max_bytes时中止下载并抛出BodyTooLargeError。
+        """
         TYPE_DIR = TYPE_DIRS.get(data_type)
-        if not TYPE_DIR: return None
+        if not TYPE_DIR or data_type == "text": return None
+        tmp_path = TMP_DIR / f".{uuid.uuid4().hex}.part"
+        hasher = new_hasher()
+        size = 0
+        loop = asyncio.get_running_loop()
+        f = await self._run(self._open_part, tmp_path)
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise BodyTooLargeError(f"响应体超过 {max_bytes} 字节")
+                await loop.run_in_executor(self._executor, self._write_chunk, f, hasher, chunk)
+            await loop.run_in_executor(self._executor, f.close)
+            if size == 0:
+                return None
+            extension = MEDIA_EXTENSIONS.get(data_type, ".dat")
+            if persist:
+                save_path = await self._run(
+                    self.blobs.store_file, tmp_path, hasher.hexdigest(), data_type, extension, TYPE_DIR / path_name
+                )
+                await self._run(self._add_to_manifest, path_name, data_type, save_path)
+            else:
+                save_path = TMP_DIR / f"{hasher.hexdigest()}{extension}"
+                save_path = await self._run(self._commit_part, tmp_path, save_path)
+            self.request_trim()
+            return save_path
+        finally:
+            f.close()
+            await self._run(tmp_path.unlink, True)
+
+    @staticmethod
+    def _open_part(tmp_path: Path):
+        tmp_path.parent.mkdir(parents=True, exist_ok=True)
+        return open(tmp_path, "wb")
+
+    @staticmethod
+    def _write_chunk(f, hasher, chunk: bytes) -> None:
+        hasher.update(chunk)
+        f.write(chunk)
 
+    @staticmethod
+    def _commit_part(tmp_path: Path, save_path: Path) -> Path:
+        """将临时文件原子地移动到目标位置，目标已存在时保留原文件"""
+        if not save_path.exists():
+            os.replace(tmp_path, save_path)
+        return save_path
+
+    async def get_data(
+        self, path_name: str, data_type: str, related: Sequence[str] = ()
+    ) -> Optional[List[BaseMessageComponent]]:
+        """从本地取出数据，path_name没有数据时依次尝试related中的名称"""
+        if data_type not in TYPE_DIRS: return None
+        picked = None
+        for name in (path_name, *related):
+            picked = await self._run(self._pick_local, name, data_type)
+            if picked is not None:
+                break
+        if picked is None: return None
         if data_type == "text":
-            json_path = TYPE_DIR / f"{path_name}.json"
-            if json_path.exists():
-                try:
-                    history = json.loads(json_path.read_text("utf-8"))
-                    if history: return self.build_chain(random.choice(history), "text")
-                except (json.JSONDecodeError, IndexError):
-                    return None
-        else:
-            save_dir = TYPE_DIR / path_name
-            if save_dir.is_dir():
-                files = [f for f in save_dir.iterdir() if f.is_file()]
-                if files:
-                    return self.build_chain(str(random.choice(files)), data_type, from_local=True)
-        return None
\ No newline at end of file
+            return self.build_chain(picked, "text")
+        return self.build_chain(picked, data_type, from_local=True)
+
+    def _pick_local(self, path_name: str, data_type: str) -> Optional[str]:
+        """随机挑选一条本地数据，文本返回内容，媒体返回文件路径"""
+        if data_type == "text":
+            return self.text_store(path_name).random()
+        picked = self.manifest(path_name, data_type).pick()
+        return str(picked) if picked else None
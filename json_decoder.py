@@ -0,0 +1,90 @@
+"""
+API响应的JSON解码层：安装了 orjson 时使用 orjson，否则使用标准库 json；
+安装了 ijson 时，可对只含键名的解析路径流式解析，取到目标值后立即停止读取。
+"""
+import json
+from typing import Any, List, Optional
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # 可选依赖
+    ijson = None
+
+BACKEND = "orjson" if orjson else "json"
+
+_BOM = b"\xef\xbb\xbf"
+
+
+class JSONDecodeError(ValueError):
+    """响应体不是合法的JSON"""
+
+
+def loads(body: bytes) -> Any:
+    """
+    解码JSON响应体。
+
+    :raises JSONDecodeError: 响应体不是合法的JSON。
+    """
+    if body.startswith(_BOM):
+        body = body[len(_BOM):]
+    try:
+        if orjson:
+            return orjson.loads(body)
+        return json.loads(body)
+    except ValueError as e:
+        raise JSONDecodeError(str(e)) from e
+
+
+def looks_like_json(body: bytes) -> bool:
+    """根据首个非空白字符判断响应体是否可能是JSON对象或数组"""
+    head = body[:64].lstrip(_BOM).lstrip()
+    return head[:1] in (b"{", b"[")
+
+
+def can_stream(keys: Optional[List[str]]) -> bool:
+    """是否可以对该键路径流式解析"""
+    return bool(ijson and keys and all(k and "." not in k for k in keys))
+
+
+class _LimitedReader:
+    """为ijson包装的异步读取器，读取超过上限时抛出too_large指定的异常"""
+
+    def __init__(self, stream, max_bytes: int, too_large: type):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.too_large = too_large
+        self.read_bytes = 0
+
+    async def read(self, n: int = -1) -> bytes:
+        chunk = await self.stream.read(n)
+        self.read_bytes += len(chunk)
+        if self.max_bytes and self.read_bytes > self.max_bytes:
+            raise self.too_large(f"响应体超过 {self.max_bytes} 字节")
+        return chunk
+
+
+async def stream_extract(stream, keys: List[str], max_bytes: int, too_large: type) -> Optional[dict]:
+    """
+    流式解析JSON，只取出keys指向的值，取到后立即停止读取。
+
+    :param stream: 带有 async read(n) 的响应流。
+    :param keys: 键路径，如 ["data", "url"]。
+    :param max_bytes: 读取上限，0表示不限制。
+    :param too_large: 超过上限时抛出的异常类型。
+    :return: 只包含目标值的嵌套字典（如 {"data": {"url": ...}}），未找到时返回None。
+    :raises JSONDecodeError: 响应体不是合法的JSON。
+    """
+    reader = _LimitedReader(stream, max_bytes, too_large)
+    try:
+        async for value in ijson.items(reader, ".".join(keys), use_float=True):
+            for key in reversed(keys):
+                value = {key: value}
+            return value
+    except ijson.JSONError as e:
+        raise JSONDecodeError(str(e)) from e
+    return None
@@ -1,11 +1,11 @@
 import asyncio
-import json
 import os
 from pathlib import Path
 import random
 import re
 import hashlib
-from typing import Any, List, Optional, Union, Dict
+import time
+from typing import Any, List, Optional, Tuple, Union, Dict
 from urllib.parse import unquote, urlparse
 
 import aiohttp
@@ -19,12 +19,35 @@ from astrbot.core.message.components import BaseMessageComponent
 from astrbot.core.star.filter.event_message_type import EventMessageType
 
 from data.plugins.astrbot_plugin_customize.api_manager import APIManager
-from data.plugins.astrbot_plugin_customize.data_manager import DataManager
+from data.plugins.astrbot_plugin_customize.cache_quota import CacheQuota
+from data.plugins.astrbot_plugin_customize.circuit_breaker import STATE_NAMES, CircuitBreakers
+from data.plugins.astrbot_plugin_customize.data_manager import DATA_PATH, BodyTooLargeError, DataManager
+from data.plugins.astrbot_plugin_customize.metrics import (
+    BUCKETS, BYTES, CACHE_HITS, ERRORS, FALLBACKS, REQUESTS, STAGE_NAMES, Metrics
+)
+from data.plugins.astrbot_plugin_customize.prefetch_scheduler import PrefetchRule, PrefetchScheduler
+from data.plugins.astrbot_plugin_customize.rate_limiter import RequestScheduler, SchedulerBusyError
+from data.plugins.astrbot_plugin_customize.response_cache import ResponseCache, make_key
+from data.plugins.astrbot_plugin_customize.trigger_matcher import TriggerTrie
+import data.plugins.astrbot_plugin_customize.api_importer as api_importer
+import data.plugins.astrbot_plugin_customize.json_decoder as json_decoder
+import data.plugins.astrbot_plugin_customize.target_path as target_path
 import data.plugins.astrbot_plugin_customize.utils as utils
 
-api_file = (
+CHUNK_SIZE = 64 * 1024
+MB = 1024 * 1024
+
+default_api_file = (
     Path(__file__).parent / "api_data.json"
-)  # api_data.json 文件路径，更新插件时会被覆盖
+)  # 插件自带的默认API，更新插件时会被覆盖
+api_file = DATA_PATH / "api_data.json"  # 实际使用的API数据，首次启动时从默认API复制
+
+
+def _is_host_failure(e: Exception) -> bool:
+    """连接失败、超时和5xx说明整个域名可能不可用，4xx等错误只与单个接口有关"""
+    if isinstance(e, aiohttp.ClientResponseError):
+        return e.status >= 500
+    return isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError))
 
 
 @register(
@@ -37,17 +60,65 @@ api_file = (
 class AstrbotPluginCustomize(Star):
     def __init__(self, context: Context, config: AstrBotConfig):
         super().__init__(context)
+        self.API = APIManager(api_file=api_file, default_file=default_api_file)
         self.load_config(config)
-        self.API = APIManager(api_file=api_file)
-        self.apis_names = self.API.get_apis_names()
-        self.data_manager = DataManager()
+        self.metrics = Metrics(enabled=self.metrics_config.get("enable", True))
+        self.data_manager = DataManager(
+            max_workers=self.io_workers,
+            metrics=self.metrics,
+            phash_distance=self.disk_cache.get("phash_distance", 0),
+        )
+        self._apply_disk_quota()
+        self.response_cache = ResponseCache(max_bytes=self.cache_max_mb * MB)
+        self.scheduler = RequestScheduler(
+            max_concurrency=self.limits.get("max_concurrency", 32),
+            host_concurrency=self.limits.get("host_concurrency", 8),
+            queue_timeout=self.limits.get("queue_timeout", 3),
+            api_rate=self.limits.get("api_rate", 0),
+            session_rate=self.limits.get("session_rate", 0),
+        )
+        self.breakers = CircuitBreakers(
+            probe=self._probe,
+            window=self.breaker_config.get("window", 20),
+            min_calls=self.breaker_config.get("min_calls", 5),
+            failure_ratio=self.breaker_config.get("failure_ratio", 0.5),
+            open_seconds=self.breaker_config.get("open_seconds", 30),
+        )
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.prefetcher = PrefetchScheduler(self._prefetch, concurrency=self.prefetch_config.get("concurrency", 2))
+        self._apply_prefetch_rules()
+        self.prefetcher.start()
+        self._metrics_task: Optional[asyncio.Task] = None
+        if self.metrics.enabled and self.metrics_config.get("port"):
+            self._metrics_task = asyncio.create_task(self._serve_metrics())
 
     def load_config(self, config: AstrBotConfig):
         self.wake_prefix: list[str] = self.context.get_config().get("wake_prefix", [])
+        self.wake_prefix_trie = TriggerTrie((p, p) for p in self.wake_prefix)
         self.prefix_mode = config.get("prefix_mode", False)
         self.debug = config.get("debug", False)
         self.auto_save_data = config.get("auto_save_data", True)
         self.timeout = config.get("timeout", 20)
+        self.batch_timeout = config.get("batch_timeout", 15)
+
+        connection = config.get("connection", {})
+        self.conn_limit = connection.get("limit", 100)
+        self.conn_limit_per_host = connection.get("limit_per_host", 10)
+        self.dns_cache_ttl = connection.get("dns_cache_ttl", 300)
+        self.keepalive_timeout = connection.get("keepalive_timeout", 30)
+        self.cache_max_mb = config.get("cache_max_mb", 64)
+        self.max_body_bytes = config.get("max_body_mb", 50) * MB
+        self.json_stream = config.get("json_stream", False)
+        self.io_workers = config.get("io_workers", 4)
+        self.disk_cache = config.get("disk_cache", {})
+        self.limits = config.get("limits", {})
+        self.breaker_config = config.get("circuit_breaker", {})
+        self.prefetch_config = config.get("prefetch", {})
+        self.metrics_config = config.get("metrics", {})
+        self.import_config = config.get("import", {})
+        mirror = config.get("mirror", {})
+        self.hedge_percentile = mirror.get("hedge_percentile", 90)
+        self.hedge_delay = mirror.get("hedge_delay", 1.0)
         
         type_switch = config.get("type_switch", {})
         self.disable_api_type = [
@@ -57,11 +128,14 @@ class AstrbotPluginCustomize(Star):
             "audio" if not type_switch.get("enable_audio", True) else None,
         ]
         self.disable_api = config.get("disable_api", [])
+        self.API.set_filters(
+            self.disable_api, self.disable_api_type, disable_dead=self.import_config.get("auto_disable", True)
+        )
 
     @filter.command("api列表")
     async def api_ls(self, event: AstrMessageEvent):
         """ 根据API字典生成分类字符串,即api列表。 """
-        api_types = {"text": [], "image": [], "video": [], "audio": []}
+        api_types = {"text": [], "image": [], "video": [], "audio": [], "batch": []}
         for key, value in self.API.apis.items():
             api_type = value.get("type", "unknown")
             if api_type in api_types:
@@ -73,6 +147,118 @@ class AstrbotPluginCustomize(Star):
                 result += f"【{api_type}】{len(keywords)}个：\n{'、'.join(keywords)}\n\n"
         yield event.plain_result(result.strip())
 
+    def _apply_disk_quota(self):
+        """根据配置和各API的disk_quota_mb设置本地缓存配额"""
+        self.data_manager.quota = CacheQuota(
+            max_bytes=self.disk_cache.get("max_mb", 0) * MB,
+            type_bytes={t: self.disk_cache.get(f"{t}_mb", 0) * MB for t in ("image", "video", "audio")},
+            api_bytes={
+                name: int(info.get("disk_quota_mb") or 0) * MB for name, info in self.API.apis.items()
+            },
+            policy=self.disk_cache.get("policy", "lru"),
+        )
+
+    def _apply_prefetch_rules(self):
+        """根据各API的prefetch设置更新预取规则"""
+        rules = {}
+        if self.prefetch_config.get("enable", True):
+            jitter = self.prefetch_config.get("jitter", 60)
+            for name, info in self.API.index.items():
+                if not isinstance(info.get("prefetch"), dict):
+                    continue
+                try:
+                    rules[name] = PrefetchRule.from_config(info["prefetch"], jitter)
+                except ValueError as e:
+                    logger.error(f"API '{name}' 预取规则无效: {e}")
+        self.prefetcher.set_rules(rules)
+
+    async def _prefetch(self, api_name: str, next_in: float):
+        """预取API，结果写入响应缓存（保留到下次预取）和本地数据"""
+        api_data = self.API.index.get(api_name)
+        if not api_data:
+            return
+        url, params = api_data.get("url"), api_data.get("params") or {}
+        data_type = api_data.get("type")
+        data = await self._limited_request(
+            url,
+            params,
+            media=(api_name, data_type) if data_type != "text" else None,
+            api_name=api_name,
+            target=api_data.get("target"),
+        )
+        if data is None:
+            logger.warning(f"API '{api_name}' 预取失败，响应为空。")
+            return
+        ttl = max(api_data.get("cache_ttl", 0), next_in)
+        self.response_cache.set(self._cache_key(url, params, api_data.get("target")), data, ttl)
+        await self._process_api_data(data, api_name, {**api_data, "cache_ttl": ttl})
+        if self.debug:
+            logger.debug(f"API '{api_name}' 预取完成，{next_in:.0f}秒后再次预取。")
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("api缓存")
+    async def api_cache(self, event: AstrMessageEvent, action: str | None = None, size_mb: int | None = None):
+        """查看本地缓存占用，/api缓存 清理 [目标MB] 可手动清理"""
+        if action == "清理":
+            quota = CacheQuota(max_bytes=size_mb * MB, policy=self.data_manager.quota.policy) if size_mb else None
+            files, freed = await self.data_manager.trim(quota)
+            await self.data_manager.compact_text()
+            yield event.plain_result(f"清理完成，删除{files}个文件，释放{freed / MB:.1f}MB。")
+            return
+
+        usage = await self.data_manager.usage()
+        quota = self.data_manager.quota
+        result = f"----本地缓存共{usage['total'] / MB:.1f}MB"
+        result += f"（上限{quota.max_bytes / MB:.0f}MB）----\n" if quota.max_bytes else "----\n"
+        blob_count, blob_size = usage["blobs"]
+        if blob_count:
+            result += f"去重后实际占用：{blob_count}个文件，{blob_size / MB:.1f}MB\n"
+        for data_type, (count, size) in usage["types"].items():
+            if count:
+                result += f"【{data_type}】{count}个文件，{size / MB:.1f}MB\n"
+        top = sorted(usage["apis"].items(), key=lambda item: item[1][1], reverse=True)[:10]
+        if top:
+            result += "\n占用最多的API：\n"
+            result += "\n".join(f"{name}：{count}个，{size / MB:.1f}MB" for (_, name), (count, size) in top)
+        yield event.plain_result(result.strip())
+
+    @filter.command("api批量")
+    async def api_batch(self, event: AstrMessageEvent):
+        """同时触发多个API并合并发送，格式: /api批量 关键词1 关键词2 ..."""
+        words = event.get_message_str().split()[1:]
+        if not words:
+            yield event.plain_result("请输入要触发的API名称，多个名称用空格分隔。")
+            return
+        chain = await self._request_batch(event, words)
+        if chain:
+            yield event.chain_result(chain)
+        else:
+            yield event.plain_result("所有API均无有效返回。")
+
+    @filter.command("api统计")
+    async def api_stats(self, event: AstrMessageEvent):
+        """查看各处理阶段的耗时和各API的请求统计"""
+        if not self.metrics.enabled:
+            yield event.plain_result("运行统计未开启。")
+            return
+        minutes = (time.time() - self.metrics.started) / 60
+        result = f"----运行统计（{minutes:.0f}分钟）----\n"
+        for stage, histogram in self.metrics.stages.items():
+            count = histogram.count
+            if count:
+                p99 = histogram.quantile(99)
+                p99_str = f"≤{p99 * 1000:.0f}ms" if p99 != float("inf") else f">{BUCKETS[-1]}s"
+                result += f"【{STAGE_NAMES[stage]}】{count}次，平均{histogram.sum / count * 1000:.1f}ms，p99{p99_str}\n"
+        top = sorted(self.metrics.counters().items(), key=lambda item: item[1][REQUESTS], reverse=True)[:10]
+        if top:
+            result += "\n请求最多的API：\n"
+            result += "\n".join(
+                f"{name}：触发{row[REQUESTS]}次，失败{row[ERRORS]}，缓存命中{row[CACHE_HITS]}，"
+                f"本地回退{row[FALLBACKS]}，流量{row[BYTES] / MB:.1f}MB"
+                for name, row in top
+            )
+        yield event.plain_result(result.strip())
+
     @filter.command("api详情")
     async def api_help(self, event: AstrMessageEvent, api_name: str | None = None):
         """查看api的详细信息"""
@@ -93,9 +279,31 @@ class AstrbotPluginCustomize(Star):
             f"api名称：{api_info.get('name') or '无'}\n"
             f"api地址：{api_info.get('url') or '无'}\n"
             f"api类型：{api_info.get('type') or '无'}\n"
+            f"别名：{'、'.join(api_info.get('aliases') or []) or '无'}\n"
+            f"组合：{'、'.join(api_info.get('apis') or []) or '无'}\n"
+            f"镜像：{'、'.join(m if isinstance(m, str) else m.get('url', '') for m in api_info.get('mirrors') or []) or '无'}\n"
             f"所需参数：{params_str}\n"
-            f"解析路径：{api_info.get('target') or '无'}"
+            f"解析路径：{api_info.get('target') or '无'}\n"
+            f"缓存时间：{api_info.get('cache_ttl') or 0}秒"
         )
+        health = api_info.get("health")
+        if health:
+            checked_at = time.strftime("%m-%d %H:%M", time.localtime(health.get("checked_at", 0)))
+            api_str += (
+                f"\n检测结果：{'可用' if health.get('ok') else '不可用（' + str(health.get('error')) + '）'}，"
+                f"延迟{health.get('latency_ms', 0)}ms，{checked_at}"
+            )
+        if api_info.get("cache_ttl"):
+            hits, misses, coalesced = self.response_cache.stats.get(api_name, [0, 0, 0])
+            api_str += f"\n缓存统计：命中{hits}次，未命中{misses}次，合并请求{coalesced}次"
+        for label, key in (("API", f"api:{api_name}"), ("域名", f"host:{urlparse(api_info.get('url', '')).netloc}")):
+            health = self.breakers.health(key)
+            if health:
+                api_str += (
+                    f"\n{label}健康：{STATE_NAMES[health['state']]}，"
+                    f"近{health['calls']}次错误率{health['error_rate']:.0%}，"
+                    f"平均延迟{health['latency'] * 1000:.0f}ms"
+                )
         yield event.plain_result(api_str)
 
     @filter.command("添加api")
@@ -109,8 +317,8 @@ class AstrbotPluginCustomize(Star):
             api_info = utils.parse_api_input(input_str)
             name = api_info.get("name")
 
-            if not name or not api_info.get("url"):
-                yield event.plain_result("添加失败，'名称'和'地址'为必填项。")
+            if not name or not (api_info.get("url") or api_info.get("apis")):
+                yield event.plain_result("添加失败，'名称'和'地址'（组合API为'组合'）为必填项。")
                 return
 
             if name in self.disable_api:
@@ -121,6 +329,8 @@ class AstrbotPluginCustomize(Star):
                 yield event.plain_result(f"API '{name}' 已存在，将自动覆盖。")
 
             self.API.add_api(api_info)
+            self._apply_disk_quota()
+            self._apply_prefetch_rules()
             yield event.plain_result(f"【{name}】API添加/更新成功。")
         except Exception as e:
             if self.debug:
@@ -128,6 +338,94 @@ class AstrbotPluginCustomize(Star):
             yield event.plain_result("添加失败，请检查格式。")
             
 
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("api导入")
+    async def import_apis(self, event: AstrMessageEvent, path: str | None = None):
+        """批量导入api并检测可用性，格式: /api导入 文件路径（json/yaml/csv/地址列表）"""
+        if not path:
+            yield event.plain_result("请输入要导入的文件路径。")
+            return
+        try:
+            entries = await asyncio.to_thread(api_importer.load_entries, Path(path))
+        except (OSError, UnicodeDecodeError, ValueError) as e:
+            yield event.plain_result(f"读取失败: {e}")
+            return
+
+        valid, errors = [], []
+        for info in entries:
+            error = api_importer.validate(info)
+            if error is None and info["name"] in self.disable_api:
+                error = "在禁用列表中"
+            if error:
+                errors.append(f"{info.get('name') or '?'}：{error}")
+            else:
+                valid.append(info)
+
+        dead = []
+        probed = await api_importer.probe_all(
+            self._get_session(),
+            valid,
+            workers=self.import_config.get("workers", 8),
+            timeout=self.import_config.get("probe_timeout", 10),
+            max_bytes=self.max_body_bytes,
+        )
+        for info, health in probed:
+            # 未填写类型时按Content-Type或解析出的地址推测
+            guessed = health.pop("type", "text")
+            info.setdefault("type", guessed)
+            info["health"] = health
+            if not health["ok"]:
+                dead.append(f"{info['name']}：{health.get('error')}")
+        self.API.add_apis(valid)
+        self._apply_disk_quota()
+        self._apply_prefetch_rules()
+
+        result = f"导入{len(valid)}个API，其中{len(dead)}个检测不可用"
+        result += "（已自动停用）。" if dead and self.API.disable_dead else "。"
+        for title, lines in (("不可用", dead), ("格式错误", errors)):
+            if lines:
+                result += f"\n\n{title}{len(lines)}个：\n" + "\n".join(lines[:20])
+                if len(lines) > 20:
+                    result += f"\n……等{len(lines)}个"
+        yield event.plain_result(result)
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("api导出")
+    async def export_apis(self, event: AstrMessageEvent, path: str | None = None):
+        """导出api，格式: /api导出 [文件路径]，按扩展名导出为json/yaml/csv"""
+        target = Path(path) if path else DATA_PATH / "api_export.json"
+        try:
+            count = await asyncio.to_thread(api_importer.export, self.API.apis, target)
+        except (OSError, ValueError) as e:
+            yield event.plain_result(f"导出失败: {e}")
+            return
+        yield event.plain_result(f"已导出{count}个API到 {target}")
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("api检测")
+    async def check_apis(self, event: AstrMessageEvent):
+        """重新检测api可用性，格式: /api检测 [名称1 名称2 ...]，不填名称时检测全部"""
+        names = event.get_message_str().split()[1:] or list(self.API.apis)
+        entries = [{"name": name, **self.API.apis[name]} for name in names if name in self.API.apis]
+        probed = await api_importer.probe_all(
+            self._get_session(),
+            entries,
+            workers=self.import_config.get("workers", 8),
+            timeout=self.import_config.get("probe_timeout", 10),
+            max_bytes=self.max_body_bytes,
+        )
+        health = {}
+        for info, result in probed:
+            result.pop("type", None)
+            health[info["name"]] = result
+        self.API.set_health(health)
+        self._apply_prefetch_rules()
+        dead = [f"{name}：{result.get('error')}" for name, result in health.items() if not result["ok"]]
+        reply = f"检测{len(health)}个API，{len(health) - len(dead)}个可用。"
+        if dead:
+            reply += f"\n\n不可用{len(dead)}个：\n" + "\n".join(dead[:20])
+        yield event.plain_result(reply)
+
     @filter.command("删除api")
     async def remove_api(self, event: AstrMessageEvent, api_name: str):
         """删除api"""
@@ -135,63 +433,402 @@ class AstrbotPluginCustomize(Star):
             yield event.plain_result("请输入要删除的API名称。")
             return
         self.API.remove_api(api_name)
+        self._apply_disk_quota()
+        self._apply_prefetch_rules()
         yield event.plain_result(f"已删除api：{api_name}")
 
-    async def _make_request(self, url: str, params: Optional[dict] = None) -> Union[bytes, str, dict, None]:
-        """发送GET请求"""
+    async def terminate(self):
+        """插件卸载时关闭共享的HTTP会话，并等待后台保存完成"""
+        # 先停止会使用会话的后台任务，避免关闭后又创建新会话
+        await self.prefetcher.close()
+        await self.breakers.close()
+        if self._metrics_task:
+            self._metrics_task.cancel()
+            await asyncio.gather(self._metrics_task, return_exceptions=True)
+        await self.metrics.close()
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        await self.API.flush()
+        await self.data_manager.close()
+
+    async def _serve_metrics(self):
+        host = self.metrics_config.get("host", "127.0.0.1")
+        port = self.metrics_config["port"]
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url=url, params=params, timeout=self.timeout) as response:
-                    response.raise_for_status()
-                    content_type = response.headers.get("Content-Type", "").lower()
-                    if "application/json" in content_type:
-                        try:
-                            return await response.json()
-                        except json.JSONDecodeError:
-                            return await response.text()
-                    if "text/" in content_type:
-                        return (await response.text()).strip()
-                    return await response.read()
+            await self.metrics.serve(host, port)
+            logger.info(f"指标接口已启动: http://{host}:{port}/metrics")
+        except OSError as e:
+            logger.error(f"指标接口启动失败: {e}")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取共享的HTTP会话，首次使用时创建，复用连接与DNS缓存"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.conn_limit,
+                limit_per_host=self.conn_limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self.session
+
+    async def _read_limited(self, response: aiohttp.ClientResponse) -> bytes:
+        """分块读取响应体，超过大小上限时中止"""
+        body = bytearray()
+        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+            body.extend(chunk)
+            if self.max_body_bytes and len(body) > self.max_body_bytes:
+                raise BodyTooLargeError(f"响应体超过 {self.max_body_bytes} 字节")
+        return bytes(body)
+
+    async def _make_request(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        media: Optional[Tuple[str, str]] = None,
+        target: Optional[str] = None,
+        label: str = "",
+    ) -> Union[bytes, str, dict, list, Path, None]:
+        """发送GET请求，失败时记录日志并返回None，参数见 _fetch"""
+        try:
+            return await self._fetch(url, params, media, target, label)
         except Exception as e:
             logger.error(f"请求异常: {url}, {e}")
             return None
 
+    async def _fetch(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        media: Optional[Tuple[str, str]] = None,
+        target: Optional[str] = None,
+        label: str = "",
+    ) -> Union[bytes, str, dict, list, Path, None]:
+        """
+        发送GET请求，label为统计接收字节数时使用的API名称。
+        传入media=(api名称, 类型)时，二进制响应会流式写入本地文件并返回文件路径。
+        开启json_stream且target只由键名组成时，JSON响应只解析到target为止。
+        请求失败时抛出异常。
+        """
+        session = self._get_session()
+        async with session.get(url=url, params=params) as response:
+            try:
+                response.raise_for_status()
+                if self.max_body_bytes and (response.content_length or 0) > self.max_body_bytes:
+                    raise BodyTooLargeError(f"Content-Length {response.content_length} 超过上限")
+                content_type = response.headers.get("Content-Type", "").lower()
+                if "json" in content_type:
+                    keys = None
+                    if target and self.json_stream:
+                        try:
+                            keys = target_path.compile_path(target).key_path
+                        except ValueError:
+                            pass
+                    if json_decoder.can_stream(keys):
+                        return await json_decoder.stream_extract(
+                            response.content, keys, self.max_body_bytes, BodyTooLargeError
+                        )
+                    body = await self._read_limited(response)
+                    try:
+                        return json_decoder.loads(body)
+                    except json_decoder.JSONDecodeError:
+                        return body.decode(response.charset or "utf-8", errors="replace")
+                if "text/" in content_type:
+                    body = await self._read_limited(response)
+                    # 不少接口以 text/html 或 text/plain 返回JSON
+                    if json_decoder.looks_like_json(body):
+                        try:
+                            return json_decoder.loads(body)
+                        except json_decoder.JSONDecodeError:
+                            pass
+                    return body.decode(response.charset or "utf-8", errors="replace").strip()
+                if media:
+                    api_name, data_type = media
+                    return await self.data_manager.save_stream(
+                        response.content.iter_chunked(CHUNK_SIZE),
+                        api_name,
+                        data_type,
+                        max_bytes=self.max_body_bytes,
+                        persist=self.auto_save_data,
+                    )
+                return await self._read_limited(response)
+            finally:
+                self.metrics.inc(label, BYTES, response.content.total_bytes)
+
+    async def _limited_request(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        media: Optional[Tuple[str, str]] = None,
+        api_name: str = "",
+        target: Optional[str] = None,
+    ) -> Union[bytes, str, dict, list, Path, None]:
+        """
+        在并发名额内发送请求并记录健康状态。
+        域名已熔断或排队超时时返回None，以便回退到本地缓存。
+        """
+        host = urlparse(url).netloc
+        label = api_name.split("#", 1)[0] or (media[0] if media else "")
+        if not self.breakers.allow(f"host:{host}"):
+            if self.debug:
+                logger.debug(f"域名 '{host}' 已熔断，跳过请求。")
+            return None
+        host_ok = True
+        try:
+            async with self.scheduler.slot(host):
+                start = time.monotonic()
+                try:
+                    data = await self._fetch(url, params, media, target, label)
+                except Exception as e:
+                    logger.error(f"请求异常: {url}, {e}")
+                    data, host_ok = None, not _is_host_failure(e)
+                elapsed = time.monotonic() - start
+        except SchedulerBusyError as e:
+            logger.warning(f"请求排队超时: {url}, {e}")
+            return None
+
+        ok = data is not None
+        self.metrics.observe("download" if media else "upstream", elapsed)
+        if not ok:
+            self.metrics.inc(label, ERRORS)
+        # 单个接口的4xx或空响应不影响同域名的其他API
+        self.breakers.record(f"host:{host}", host_ok, elapsed, url, params)
+        if api_name:
+            self.breakers.record(f"api:{api_name}", ok, elapsed, url, params)
+        return data
+
+    async def _probe(self, url: str, params: Optional[dict] = None) -> bool:
+        """熔断后的后台探测，上游返回有效响应时视为恢复"""
+        return await self._make_request(url, params) is not None
+
+    def _cache_key(self, url: str, params: Optional[dict], target: Optional[str]):
+        """响应缓存的键，流式解析时结果只含target部分，因此target也要计入"""
+        key = make_key(url, params)
+        return (key, target) if self.json_stream and target else key
+
+    async def _cached_request(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        api_name: str = "",
+        cache_ttl: float = 0,
+        media: Optional[Tuple[str, str]] = None,
+        health_key: Optional[str] = None,
+        target: Optional[str] = None,
+    ) -> Union[bytes, str, dict, list, Path, None]:
+        """
+        带响应缓存的请求，health_key默认为api_name。
+        cache_ttl为0时只使用已有的缓存（如预取结果），不缓存本次结果。
+        """
+        health_key = api_name if health_key is None else health_key
+        key = self._cache_key(url, params, target)
+        cached = self.response_cache.get(key)
+        if isinstance(cached, Path) and not cached.exists():
+            self.response_cache.discard(key)
+        elif cached is not None:
+            self.metrics.inc(api_name or (media[0] if media else ""), CACHE_HITS)
+            if not cache_ttl:
+                return cached
+        if not cache_ttl:
+            return await self._limited_request(url, params, media, health_key, target)
+        return await self.response_cache.get_or_fetch(
+            key,
+            cache_ttl,
+            lambda: self._limited_request(url, params, media, health_key, target),
+            tag=api_name,
+        )
+
     @filter.event_message_type(EventMessageType.ALL)
     async def match_api(self, event: AstrMessageEvent):
         """主处理函数"""
+        start = time.monotonic()
         msg_text = self._check_prefix(event)
         if msg_text is None:
             return
 
-        msgs = msg_text.split(" ")
-        api_name = next((i for i in self.apis_names if i == msgs[0]), None)
-        if not self._is_api_enabled(api_name):
+        matched = self.API.match(msg_text)
+        self.metrics.observe("match", time.monotonic() - start)
+        if matched is None:
             return
 
-        api_data = self.API.get_api_info(api_name)
-        args = msgs[1:]
-        update_params = await self._prepare_params(event, args, api_data.get("params", {}))
-        
-        if self.debug:
-            logger.debug(f"请求API: {api_name}, 参数: {update_params}")
-
-        data = await self._make_request(url=api_data.get("url"), params=update_params)
-
-        if data is not None:
-            chain = await self._process_api_data(data, api_name, api_data)
+        api_name, api_data, rest = matched
+        if api_data.get("type") == "batch":
+            chain = await self._request_batch(event, api_data.get("apis") or [], api_data.get("timeout"))
         else:
-            logger.warning(f"API '{api_name}' 响应为空，尝试本地缓存。")
-            chain = await self.data_manager.get_data(api_name, api_data.get("type"))
+            chain = await self._request_one(event, api_name, api_data, rest.split())
 
         if chain:
+            send_start = time.monotonic()
             try:
                 await event.send(event.chain_result(chain))
                 event.stop_event()
             except Exception as e:
                 logger.error(f"发送消息失败: {e}")
+            now = time.monotonic()
+            self.metrics.observe("send", now - send_start)
+            self.metrics.observe("total", now - start)
         elif self.debug:
             logger.debug(f"API '{api_name}' 无有效返回且无缓存。")
             
+    async def _request_one(
+        self, event: AstrMessageEvent, api_name: str, api_data: dict, args: list
+    ) -> Optional[List[BaseMessageComponent]]:
+        """触发单个API，超出限流时使用本地缓存"""
+        self.metrics.inc(api_name, REQUESTS)
+        if not self.scheduler.allow(api_name, event.unified_msg_origin, api_data.get("rate_limit")):
+            if self.debug:
+                logger.debug(f"API '{api_name}' 触发过于频繁，使用本地缓存。")
+            return await self._fallback(api_name, api_data.get("type"))
+        return await self._request_api(event, api_name, api_data, args)
+
+    async def _request_batch(
+        self, event: AstrMessageEvent, words: List[str], timeout: Optional[float] = None
+    ) -> List[BaseMessageComponent]:
+        """
+        同时触发多个API，合并为一条消息链。
+        每项单独计时，超时或失败的项使用本地缓存，不影响其他项。
+        """
+        timeout = timeout or self.batch_timeout
+        names = []
+        for word in words:
+            api_name = self.API.resolve(word)
+            if api_name is None or self.API.index[api_name].get("type") == "batch":
+                logger.warning(f"批量请求中的 '{word}' 不是可用的API，已跳过。")
+            elif api_name not in names:
+                names.append(api_name)
+
+        async def run(api_name: str) -> Optional[List[BaseMessageComponent]]:
+            api_data = self.API.index[api_name]
+            try:
+                return await asyncio.wait_for(self._request_one(event, api_name, api_data, []), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"API '{api_name}' 批量请求超时，尝试本地缓存。")
+            except Exception as e:
+                logger.error(f"API '{api_name}' 批量请求失败: {e}")
+            return await self._fallback(api_name, api_data.get("type"))
+
+        chain: List[BaseMessageComponent] = []
+        for result in await asyncio.gather(*(run(name) for name in names)):
+            if not result:
+                continue
+            if chain and isinstance(chain[-1], Comp.Plain):
+                chain.append(Comp.Plain("\n"))
+            chain.extend(result)
+        return chain
+
+    async def _request_api(
+        self, event: AstrMessageEvent, api_name: str, api_data: dict, args: list
+    ) -> Optional[List[BaseMessageComponent]]:
+        """请求API（及其镜像）并构建消息链，全部失败或已熔断时回退到本地缓存"""
+        data_type = api_data.get("type")
+        mirrors = self._rank_mirrors(api_name)
+        if not mirrors:
+            if self.debug:
+                logger.debug(f"API '{api_name}' 已熔断，使用本地缓存。")
+            return await self._fallback(api_name, data_type)
+
+        if len(mirrors) == 1:
+            chain = await self._request_mirror(event, api_name, api_data, args, *mirrors[0])
+        else:
+            chain = await self._hedge_mirrors(event, api_name, api_data, args, mirrors)
+        if chain:
+            return chain
+        logger.warning(f"API '{api_name}' 响应为空，尝试本地缓存。")
+        return await self._fallback(api_name, data_type)
+
+    async def _fallback(self, api_name: str, data_type: str) -> Optional[List[BaseMessageComponent]]:
+        """从本地缓存取数据，API自己没有缓存时再从其镜像API的缓存中取"""
+        self.metrics.inc(api_name, FALLBACKS)
+        mirrors = (self.API.get_api_info(api_name) or {}).get("mirrors") or []
+        related = [m for m in mirrors if isinstance(m, str) and m in self.API.apis]
+        return await self.data_manager.get_data(api_name, data_type, related)
+
+    def _rank_mirrors(self, api_name: str) -> List[Tuple[str, dict]]:
+        """
+        列出未熔断的镜像 (健康统计名称, 镜像)，先按最近错误率、再按平均延迟从低到高排序。
+        只有失败记录的镜像没有延迟数据，排在最后；没有统计数据的镜像排在同错误率的前面，以便尽快获得数据。
+        """
+        ranked = []
+        for i, mirror in enumerate(self.API.get_mirrors(api_name)):
+            key = api_name if i == 0 else f"{api_name}#{i}"
+            if not self.breakers.allow(f"api:{key}"):
+                continue
+            health = self.breakers.health(f"api:{key}")
+            if health is None:
+                rank = (False, 0.0, 0.0)
+            else:
+                failed_only = health["calls"] > 0 and health["error_rate"] >= 1
+                rank = (failed_only, health["error_rate"], health["latency"])
+            ranked.append((rank, i, key, mirror))
+        ranked.sort(key=lambda item: item[:2])
+        return [(key, mirror) for _, _, key, mirror in ranked]
+
+    async def _request_mirror(
+        self, event: AstrMessageEvent, api_name: str, api_data: dict, args: list, health_key: str, mirror: dict
+    ) -> List[BaseMessageComponent]:
+        """请求单个镜像并构建消息链"""
+        update_params = await self._prepare_params(event, args, mirror.get("params") or {})
+
+        if self.debug:
+            logger.debug(f"请求API: {api_name}({mirror['url']}), 参数: {update_params}")
+
+        data_type = mirror.get("type")
+        data = await self._cached_request(
+            mirror["url"],
+            update_params,
+            api_name,
+            api_data.get("cache_ttl", 0),
+            media=(api_name, data_type) if data_type != "text" else None,
+            health_key=health_key,
+            target=mirror.get("target"),
+        )
+        if data is None:
+            return []
+        return await self._process_api_data(data, api_name, {**api_data, **mirror})
+
+    async def _hedge_mirrors(
+        self, event: AstrMessageEvent, api_name: str, api_data: dict, args: list, mirrors: List[Tuple[str, dict]]
+    ) -> List[BaseMessageComponent]:
+        """
+        依次请求镜像，取第一个有效结果并取消其余请求。
+        race模式同时请求所有镜像；hedge模式在当前镜像超过延迟百分位仍未返回或失败时，再请求下一个。
+        """
+        queue = list(mirrors)
+        pending = set()
+
+        def launch():
+            key, mirror = queue.pop(0)
+            pending.add(asyncio.create_task(self._request_mirror(event, api_name, api_data, args, key, mirror)))
+
+        if api_data.get("mirror_mode") == "race":
+            while queue:
+                launch()
+            delay = None
+        else:
+            delay = self.breakers.latency(f"api:{mirrors[0][0]}", self.hedge_percentile) or self.hedge_delay
+            launch()
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=delay if queue else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is not None:
+                        logger.error(f"API '{api_name}' 镜像请求异常: {task.exception()}")
+                    elif task.result():
+                        return task.result()
+                if queue:
+                    launch()
+            return []
+        finally:
+            for task in pending:
+                task.cancel()
+
     def _check_prefix(self, event: AstrMessageEvent) -> Optional[str]:
         """检查前缀模式和消息有效性"""
         msg_text = event.get_message_str()
@@ -199,23 +836,13 @@ class AstrbotPluginCustomize(Star):
             if not event.is_prefix and not event.is_at:
                 return None
             if event.is_prefix:
-                for p in self.wake_prefix:
-                    if msg_text.startswith(p):
-                        return msg_text[len(p):].lstrip()
+                found = self.wake_prefix_trie.longest_prefix(msg_text)
+                if found:
+                    return msg_text[found[1]:].lstrip()
         elif msg_text.startswith('/'):
             return None
         return msg_text
 
-    def _is_api_enabled(self, api_name: Optional[str]) -> bool:
-        """检查API是否有效且未被禁用"""
-        if not api_name or api_name in self.disable_api:
-            return False
-        api_type = self.API.get_api_info(api_name).get("type")
-        if api_type in self.disable_api_type:
-            if self.debug: logger.debug(f"API类型 '{api_type}' 已被禁用。")
-            return False
-        return True
-
     async def _prepare_params(self, event: AstrMessageEvent, args: list, params: dict) -> dict:
         """准备API请求参数"""
         update_params = dict(params)  # Start with default params
@@ -254,9 +881,18 @@ class AstrbotPluginCustomize(Star):
         data_type = api_data.get("type")
         target = api_data.get("target")
 
-        # 1. 如果有target，从字典中提取数据
-        if isinstance(data, dict) and target:
-            data = utils.get_nested_value(data, target)
+        # 1. 如果有target，从JSON中提取数据
+        if isinstance(data, (dict, list)) and target:
+            start = time.monotonic()
+            data = target_path.extract(data, target)
+            self.metrics.observe("extract", time.monotonic() - start)
+
+        # 多值结果：文本逐行拼接，媒体随机取一个
+        if isinstance(data, list):
+            if data_type == "text":
+                data = "\n".join(str(v) for v in data if v is not None)
+            else:
+                data = random.choice(data) if data else None
 
         if data is None:
             return []
@@ -264,38 +900,31 @@ class AstrbotPluginCustomize(Star):
         # 2. 处理文本类型
         if data_type == "text":
             if self.auto_save_data:
-                await self.data_manager.save_data(data, api_name, data_type)
+                self.data_manager.schedule_save(data, api_name, data_type)
             return self.data_manager.build_chain(data, data_type)
 
         # 3. 处理非文本类型 (image, video, audio)
-        bytes_data = None
-        source_url = None
-
         if isinstance(data, str):
             source_url = utils.extract_url(data)
             if not source_url:
                 return []  # 字符串中没有有效的URL
-            
-            bytes_data = await self._make_request(source_url)
-            if bytes_data is None:
-                # 下载失败，直接使用原始URL或API地址作为后备
+
+            data = await self._cached_request(
+                source_url, cache_ttl=api_data.get("cache_ttl", 0), media=(api_name, data_type)
+            )
+            if not isinstance(data, (Path, bytes)):
+                # 下载失败，直接使用原始URL作为后备
                 return self.data_manager.build_chain(source_url, data_type)
-        
-        elif isinstance(data, bytes):
-            bytes_data = data
-        
-        else:
-            return [] # 无法处理的非文本数据类型
 
-        # 保存数据
-        if self.auto_save_data:
-            await self.data_manager.save_data(bytes_data, api_name, data_type)
+        if isinstance(data, Path):
+            # 已流式保存到本地，直接从文件构建消息链
+            return self.data_manager.build_chain(str(data), data_type, from_local=True)
 
-        # 构建消息链
-        if data_type == "image":
-            # 图片可以直接使用bytes
-            return self.data_manager.build_chain(bytes_data, data_type)
-        else:
-            # 视频/音频需要URL，优先使用响应中提取的URL
-            final_url = source_url or api_data.get("url")
-            return self.data_manager.build_chain(final_url, data_type)
+        if isinstance(data, bytes):
+            if self.auto_save_data:
+                self.data_manager.schedule_save(data, api_name, data_type)
+            if data_type == "image":
+                return self.data_manager.build_chain(data, data_type)
+            return self.data_manager.build_chain(api_data.get("url"), data_type)
+
+        return []  # 无法处理的非文本数据类型
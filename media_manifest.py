@@ -0,0 +1,211 @@
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class MediaManifest:
+    """
+    单个媒体API缓存目录的文件清单。
+    文件名保存在数组中以便O(1)随机选取，同时记录大小、最近使用时间、使用次数和文件标识。
+    """
+
+    def __init__(self, directory: Path, flush_every: int = 50):
+        """
+        初始化MediaManifest，首次访问时才加载。
+
+        :param directory: 媒体缓存目录。
+        :param flush_every: 新增或移除多少个文件后自动写入磁盘。
+        """
+        self.directory = directory
+        # 清单放在目录之外，写入清单不会改变目录的修改时间
+        self.path = directory.parent / f".{directory.name}.manifest.json"
+        self._lock = threading.Lock()
+        self._names: List[str] = []
+        self._positions: Dict[str, int] = {}
+        # 文件名 -> [大小, 最近使用时间, 使用次数, 文件标识 [设备号, inode]]，旧版清单中没有文件标识
+        self._entries: Dict[str, list] = {}
+        self._loaded = False
+        self._dirty = False
+        self._flush_every = flush_every
+        self._pending = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._names)
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self._load():
+            self._rebuild()
+
+    def _dir_mtime(self) -> float:
+        try:
+            return self.directory.stat().st_mtime
+        except FileNotFoundError:
+            return 0.0
+
+    def _load(self) -> bool:
+        """读取持久化的清单，目录在上次保存后有变化时视为失效"""
+        try:
+            saved = json.loads(self.path.read_text("utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError, OSError):
+            return False
+        if saved.get("mtime") != self._dir_mtime():
+            return False
+        for name, entry in saved.get("files", {}).items():
+            self._insert(name, list(entry))
+        return True
+
+    def _rebuild(self) -> None:
+        """扫描目录重建清单，保留已有的使用记录"""
+        old = self._entries
+        self._names, self._positions, self._entries = [], {}, {}
+        if self.directory.is_dir():
+            with os.scandir(self.directory) as it:
+                for item in it:
+                    if item.name.startswith(".") or not item.is_file():
+                        continue
+                    stat = item.stat()
+                    entry = (old.get(item.name) or [stat.st_size, stat.st_mtime, 0])[:3]
+                    self._insert(item.name, [*entry, [stat.st_dev, stat.st_ino]])
+        self._dirty = True
+
+    def _insert(self, name: str, entry: list) -> None:
+        if name not in self._positions:
+            self._positions[name] = len(self._names)
+            self._names.append(name)
+        self._entries[name] = entry
+
+    def _delete(self, name: str) -> None:
+        pos = self._positions.pop(name, None)
+        if pos is None:
+            return
+        last = self._names.pop()
+        if last != name:
+            self._names[pos] = last
+            self._positions[last] = pos
+        self._entries.pop(name, None)
+
+    def add(self, name: str, size: int, file_id: Optional[Tuple[int, int]] = None) -> None:
+        """
+        记录新保存的文件。
+
+        :param name: 文件名。
+        :param size: 文件大小（字节）。
+        :param file_id: 文件标识 (设备号, inode)，硬链接到同一文件的记录标识相同。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get(name)
+            if entry is None:
+                self._insert(name, [size, time.time(), 0, list(file_id) if file_id else None])
+                self._pending += 1
+            else:
+                entry[1] = time.time()
+                if file_id:
+                    entry[3:] = [list(file_id)]
+            self._dirty = True
+            if self._pending >= self._flush_every:
+                self._flush_locked()
+
+    def remove(self, name: str) -> None:
+        """
+        从清单中移除文件（不删除文件本身）。
+
+        :param name: 文件名。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self._delete(name)
+            self._dirty = True
+            self._pending += 1
+            if self._pending >= self._flush_every:
+                self._flush_locked()
+
+    def evict(self, name: str) -> int:
+        """
+        删除文件并从清单中移除。
+
+        :param name: 文件名。
+        :return: 释放的字节数，文件还有其他硬链接时为0（由 BlobStore.gc 统计）。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            path = self.directory / name
+            try:
+                stat = path.stat()
+                freed = stat.st_size if stat.st_nlink <= 1 else 0
+                path.unlink()
+            except FileNotFoundError:
+                freed = 0
+            self._delete(name)
+            self._dirty = True
+            self._pending += 1
+            if self._pending >= self._flush_every:
+                self._flush_locked()
+            return freed
+
+    def pick(self) -> Optional[Path]:
+        """
+        随机选取一个仍然存在的文件，并更新其使用记录。
+
+        :return: 文件路径，清单为空时返回None。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            while self._names:
+                name = random.choice(self._names)
+                path = self.directory / name
+                if path.exists():
+                    entry = self._entries[name]
+                    entry[1] = time.time()
+                    entry[2] += 1
+                    self._dirty = True
+                    return path
+                self._delete(name)
+                self._dirty = True
+            return None
+
+    def set_file_id(self, name: str, file_id: Tuple[int, int]) -> None:
+        """补充旧版清单中缺少的文件标识"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                entry[3:] = [list(file_id)]
+                self._dirty = True
+
+    def entries(self) -> Iterator[Tuple[str, int, float, int, Optional[Tuple[int, int]]]]:
+        """
+        遍历清单中的文件。
+
+        :return: (文件名, 大小, 最近使用时间, 使用次数, 文件标识) 的迭代器，文件标识未知时为None。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            items = [
+                (name, size, last_used, hits, tuple(file_id[0]) if file_id and file_id[0] else None)
+                for name, (size, last_used, hits, *file_id) in self._entries.items()
+            ]
+        return iter(items)
+
+    def flush(self) -> None:
+        """将有变化的清单写入磁盘"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._dirty or not self.directory.is_dir():
+            return
+        tmp_path = self.path.with_suffix(".tmp")
+        saved = {"mtime": self._dir_mtime(), "files": self._entries}
+        tmp_path.write_text(json.dumps(saved, ensure_ascii=False), "utf-8")
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self._pending = 0
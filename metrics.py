@@ -0,0 +1,145 @@
+"""
+轻量的运行指标：按API计数，按处理阶段统计延迟直方图，可输出Prometheus文本格式。
+每个API的计数器在首次出现时创建，之后每条消息只做整数累加，不分配新对象。
+"""
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+# 每个API的计数器下标
+REQUESTS, ERRORS, CACHE_HITS, FALLBACKS, BYTES = range(5)
+COUNTERS = (
+    ("requests", "触发次数"),
+    ("errors", "上游请求失败次数"),
+    ("cache_hits", "响应缓存命中次数"),
+    ("fallbacks", "回退到本地缓存的次数"),
+    ("bytes", "从上游接收的字节数"),
+)
+
+# 处理阶段
+STAGES = ("match", "upstream", "download", "extract", "save", "send", "total")
+STAGE_NAMES = {
+    "match": "匹配",
+    "upstream": "请求",
+    "download": "下载",
+    "extract": "解析",
+    "save": "保存",
+    "send": "发送",
+    "total": "总计",
+}
+
+# 直方图的桶上限（秒），最后还有一个 +Inf 桶
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    """
+    固定桶的延迟直方图。
+    """
+
+    __slots__ = ("counts", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def quantile(self, pct: float) -> Optional[float]:
+        """按桶估算百分位数，返回所在桶的上限，落在 +Inf 桶时返回inf，没有样本时返回None"""
+        total = self.count
+        if not total:
+            return None
+        rank, seen = total * pct / 100, 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metrics:
+    """
+    插件运行指标，关闭时所有记录操作直接返回。
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.started = time.time()
+        self._counters: Dict[str, List[int]] = {}
+        self.stages: Dict[str, Histogram] = {stage: Histogram() for stage in STAGES}
+        self._runner: Optional[web.AppRunner] = None
+
+    def inc(self, api_name: str, counter: int, value: int = 1) -> None:
+        """
+        累加API的计数器。
+
+        :param api_name: API名称，为空时忽略。
+        :param counter: 计数器下标，如 REQUESTS。
+        :param value: 增加的值。
+        """
+        if not self.enabled or not api_name:
+            return
+        row = self._counters.get(api_name)
+        if row is None:
+            row = self._counters[api_name] = [0] * len(COUNTERS)
+        row[counter] += value
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """记录某个处理阶段的耗时（秒）"""
+        if self.enabled:
+            self.stages[stage].observe(seconds)
+
+    def counters(self) -> Dict[str, Tuple[int, ...]]:
+        """各API的计数器快照"""
+        return {name: tuple(row) for name, row in self._counters.items()}
+
+    def render(self) -> str:
+        """输出Prometheus文本格式"""
+        lines = []
+        for i, (name, help_text) in enumerate(COUNTERS):
+            metric = f"customize_api_{name}_total"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for api_name, row in self._counters.items():
+                lines.append(f'{metric}{{api="{_escape(api_name)}"}} {row[i]}')
+
+        metric = "customize_stage_seconds"
+        lines.append(f"# HELP {metric} 各处理阶段的耗时")
+        lines.append(f"# TYPE {metric} histogram")
+        for stage, histogram in self.stages.items():
+            cumulative = 0
+            for bound, count in zip((*BUCKETS, "+Inf"), histogram.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {histogram.sum}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {cumulative}')
+        return "\n".join(lines) + "\n"
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+    async def serve(self, host: str, port: int) -> None:
+        """在本地启动 /metrics HTTP接口"""
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def close(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,195 @@
+import asyncio
+import heapq
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from astrbot.api import logger
+
+# 字段名 -> (最小值, 最大值)
+CRON_FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+
+
+def _parse_field(expr: str, low: int, high: int) -> Set[int]:
+    """解析单个cron字段，支持 *、a-b、a,b 和 /n"""
+    values = set()
+    for part in expr.split(","):
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/", 1)
+            step = int(step_str)
+        if part in ("*", ""):
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(x) for x in part.split("-", 1))
+        else:
+            start = end = int(part)
+            if step != 1:
+                end = high
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f"cron字段超出范围: {expr}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronRule:
+    """
+    五段式cron表达式：分 时 日 月 周（0为周日）。
+    """
+
+    def __init__(self, expr: str):
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError(f"cron表达式需要5个字段: {expr}")
+        self.minute, self.hour, self.day, self.month, weekday = (
+            _parse_field(part, low, high) for part, (_, low, high) in zip(parts, CRON_FIELDS)
+        )
+        # cron中周日可写作0或7，这里统一转换为Python的weekday（周一为0）
+        self.weekday = {(d - 1) % 7 for d in weekday}
+        self.day_any = parts[2] == "*"
+        self.weekday_any = parts[4] == "*"
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day_ok = dt.day in self.day
+        weekday_ok = dt.weekday() in self.weekday
+        # 与标准cron一致：日和周都有限制时，满足其一即可
+        if self.day_any or self.weekday_any:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, dt: datetime) -> datetime:
+        """计算dt之后的下一个触发时间"""
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 4)
+        while dt < limit:
+            if dt.month not in self.month:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.hour:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.minute:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+        raise ValueError("cron表达式没有可触发的时间")
+
+
+class PrefetchRule:
+    """
+    单个API的预取规则，interval（秒）与cron二选一。
+    """
+
+    def __init__(self, interval: float = 0, cron: str = "", jitter: float = 0):
+        if not interval and not cron:
+            raise ValueError("预取规则需要设置 interval 或 cron")
+        self.interval = interval
+        self.cron_expr = cron
+        self.cron = CronRule(cron) if cron else None
+        self.jitter = jitter
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PrefetchRule):
+            return NotImplemented
+        return (self.interval, self.cron_expr, self.jitter) == (other.interval, other.cron_expr, other.jitter)
+
+    @classmethod
+    def from_config(cls, config: dict, default_jitter: float = 0) -> "PrefetchRule":
+        return cls(
+            interval=float(config.get("interval") or 0),
+            cron=config.get("cron") or "",
+            jitter=float(config.get("jitter", default_jitter)),
+        )
+
+    def next_delay(self, first: bool = False) -> float:
+        """距离下次执行的秒数（含随机抖动）；interval规则首次立即执行"""
+        if self.cron:
+            now = datetime.now()
+            delay = (self.cron.next_after(now) - now).total_seconds()
+        else:
+            delay = 0 if first else self.interval
+        return delay + random.uniform(0, self.jitter)
+
+
+class PrefetchScheduler:
+    """
+    后台预取调度器，按规则定时调用预取函数，限制同时进行的预取数量。
+    """
+
+    def __init__(self, prefetch: Callable[[str, float], Awaitable[None]], concurrency: int = 2):
+        """
+        初始化PrefetchScheduler。
+
+        :param prefetch: 预取函数，参数为 (API名称, 距下次预取的秒数)。
+        :param concurrency: 同时进行的预取数量。
+        """
+        self.prefetch = prefetch
+        self.concurrency = concurrency
+        self.rules: Dict[str, PrefetchRule] = {}
+        # API名称 -> (规则, 下次执行的monotonic时间)，规则未变化时重建时间表沿用原时间
+        self._next: Dict[str, Tuple[PrefetchRule, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+        self._changed = asyncio.Event()
+
+    def set_rules(self, rules: Dict[str, PrefetchRule]) -> None:
+        """替换全部预取规则，正在运行的调度循环会重新计算时间表"""
+        self.rules = dict(rules)
+        self._changed.set()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        while True:
+            self._changed.clear()
+            heap: List[Tuple[float, str]] = []
+            for name, rule in self.rules.items():
+                previous = self._next.get(name)
+                if previous and previous[0] == rule:
+                    run_at = previous[1]
+                else:
+                    try:
+                        run_at = time.monotonic() + rule.next_delay(first=True)
+                    except ValueError as e:
+                        logger.error(f"API '{name}' 预取规则无效: {e}")
+                        continue
+                self._next[name] = (rule, run_at)
+                heapq.heappush(heap, (run_at, name))
+
+            while heap and not self._changed.is_set():
+                run_at, name = heap[0]
+                try:
+                    await asyncio.wait_for(self._changed.wait(), max(0.0, run_at - time.monotonic()))
+                    break  # 规则有变化，重建时间表
+                except asyncio.TimeoutError:
+                    pass
+                heapq.heappop(heap)
+                rule = self.rules[name]
+                delay = rule.next_delay()
+                self._next[name] = (rule, time.monotonic() + delay)
+                heapq.heappush(heap, (self._next[name][1], name))
+                task = asyncio.create_task(self._run(semaphore, name, delay))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+            if not heap:
+                await self._changed.wait()
+
+    async def _run(self, semaphore: asyncio.Semaphore, name: str, next_in: float) -> None:
+        async with semaphore:
+            try:
+                await self.prefetch(name, next_in)
+            except Exception as e:
+                logger.error(f"API '{name}' 预取失败: {e}")
+
+    async def close(self) -> None:
+        """取消调度循环和正在进行的预取"""
+        tasks = [t for t in (self._task, *self._running) if t]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
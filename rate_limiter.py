@@ -0,0 +1,124 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Hashable, Optional
+
+# 令牌桶数量超过此值时清理已回满的桶
+MAX_BUCKETS = 10000
+
+
+class SchedulerBusyError(Exception):
+    """等待并发名额超时"""
+
+
+class TokenBucket:
+    """
+    令牌桶，容量为每分钟的请求数，按秒匀速补充。
+    """
+
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> bool:
+        """取一个令牌，没有令牌时返回False"""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def is_full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+class RequestScheduler:
+    """
+    请求调度：全局与单域名的并发上限，以及按API、按用户/群的令牌桶限流。
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 32,
+        host_concurrency: int = 8,
+        queue_timeout: float = 3,
+        api_rate: int = 0,
+        session_rate: int = 0,
+    ):
+        """
+        初始化RequestScheduler，限流值为0表示不限制。
+
+        :param max_concurrency: 全局同时进行的上游请求数。
+        :param host_concurrency: 单个域名同时进行的上游请求数。
+        :param queue_timeout: 等待并发名额的最长时间（秒）。
+        :param api_rate: 每个API每分钟的默认请求数。
+        :param session_rate: 每个用户/群每分钟可触发的次数。
+        """
+        self.queue_timeout = queue_timeout
+        self.api_rate = api_rate
+        self.session_rate = session_rate
+        self.host_concurrency = host_concurrency
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+
+    def _take(self, key: Hashable, per_minute: int) -> bool:
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.capacity != per_minute:
+            if len(self._buckets) >= MAX_BUCKETS:
+                self._buckets = {k: b for k, b in self._buckets.items() if not b.is_full()}
+            bucket = self._buckets[key] = TokenBucket(per_minute)
+        return bucket.take()
+
+    def allow(self, api_name: str, session_key: str, api_rate: Optional[int] = None) -> bool:
+        """
+        检查本次触发是否在限流范围内。
+
+        :param api_name: API名称。
+        :param session_key: 用户或群的标识。
+        :param api_rate: 该API每分钟的请求数，为None时使用默认值。
+        :return: 未超出限流时返回True。
+        """
+        if self.session_rate and not self._take(("session", session_key, api_name), self.session_rate):
+            return False
+        rate = self.api_rate if api_rate is None else api_rate
+        if rate and not self._take(("api", api_name), rate):
+            return False
+        return True
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        """
+        获取一个全局和单域名的并发名额，等待超时时抛出SchedulerBusyError。
+
+        :param host: 上游域名。
+        """
+        host_sem = self._hosts.get(host)
+        if host_sem is None:
+            host_sem = self._hosts[host] = asyncio.Semaphore(self.host_concurrency)
+        # 先取域名名额，避免等待同一域名的请求占住全局名额
+        deadline = time.monotonic() + self.queue_timeout
+        try:
+            await asyncio.wait_for(host_sem.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise SchedulerBusyError(f"{host} 并发已满")
+        try:
+            try:
+                await asyncio.wait_for(self._global.acquire(), max(0.01, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                raise SchedulerBusyError("全局并发已满")
+            try:
+                yield
+            finally:
+                self._global.release()
+        finally:
+            host_sem.release()
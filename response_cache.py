@@ -0,0 +1,141 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+def make_key(url: str, params: Optional[dict] = None) -> Tuple[str, tuple]:
+    """以URL和规范化后的参数生成缓存键"""
+    if not params:
+        return url, ()
+    return url, tuple(sorted((str(k), "" if v is None else str(v)) for k, v in params.items()))
+
+
+def _sizeof(value: Any) -> int:
+    """估算缓存值占用的字节数"""
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    try:
+        return len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 1024
+
+
+class ResponseCache:
+    """
+    内存响应缓存，按条目TTL过期，按总字节数做LRU淘汰，并合并相同的并发请求。
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        初始化ResponseCache。
+
+        :param max_bytes: 缓存允许占用的最大字节数。
+        """
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        # key -> (过期时间, 字节数, 值)
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # 统计名称 -> [命中, 未命中, 合并等待]
+        self.stats: Dict[str, list] = {}
+
+    def _count(self, tag: str, index: int) -> None:
+        if not tag:
+            return
+        self.stats.setdefault(tag, [0, 0, 0])[index] += 1
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        读取未过期的缓存值。
+
+        :param key: 缓存键。
+        :return: 缓存值，不存在或已过期则返回None。
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expire_at, size, value = entry
+        if expire_at < time.monotonic():
+            del self._entries[key]
+            self.total_bytes -= size
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """
+        写入缓存值，超出容量时淘汰最久未使用的条目。
+
+        :param key: 缓存键。
+        :param value: 缓存值。
+        :param ttl: 存活时间（秒）。
+        """
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.total_bytes -= old[1]
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes and self._entries:
+            _, (_, old_size, _) = self._entries.popitem(last=False)
+            self.total_bytes -= old_size
+
+    def discard(self, key: Hashable) -> None:
+        """
+        移除一个缓存条目。
+
+        :param key: 缓存键。
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+        self.total_bytes = 0
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        ttl: float,
+        fetch: Callable[[], Awaitable[Any]],
+        tag: str = "",
+    ) -> Any:
+        """
+        优先返回缓存值；未命中时调用fetch，同一键的并发调用只发起一次请求。
+
+        :param key: 缓存键。
+        :param ttl: 存活时间（秒）。
+        :param fetch: 未命中时获取数据的协程函数，返回None表示失败且不缓存。
+        :param tag: 统计名称，通常为API名称，为空时不计入统计。
+        :return: 缓存值或fetch的结果。
+        """
+        value = self.get(key)
+        if value is not None:
+            self._count(tag, 0)
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._count(tag, 2)
+            return await asyncio.shield(task)
+
+        self._count(tag, 1)
+        task = asyncio.ensure_future(fetch())
+        self._inflight[key] = task
+
+        def _done(t: asyncio.Future):
+            self._inflight.pop(key, None)
+            if not t.cancelled() and t.exception() is None and t.result() is not None:
+                self.set(key, t.result(), ttl)
+
+        task.add_done_callback(_done)
+        # shield: 发起者被取消时，不影响其他等待者
+        return await asyncio.shield(task)
@@ -0,0 +1,310 @@
+"""
+解析路径（target）的小型路径语言，兼容原有的 a.b[0].c 与 [] 随机写法：
+
+    a.b            字典取键，键名可用引号包裹：['a.b']
+    [0] [-1]       列表下标
+    []             从列表中随机取一个
+    * / [*]        通配，取所有子元素
+    [1:5] [::2]    切片
+    [0,2] ['a','b']  多选
+    [?url$=.mp4]   过滤，支持 == != ^= $= *= ~= > < >= <=，省略运算符表示字段存在
+    |random |first |last |join |join(,)   对结果集的后处理
+
+路径在首次使用时编译并缓存，之后只做求值。
+"""
+import random
+import re
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+_FILTER_RE = re.compile(r"^\s*@?\.?([^=!^$*~<>]*)\s*(==|!=|\^=|\$=|\*=|~=|>=|<=|>|<)?\s*(.*?)\s*$")
+_NUMBER_RE = re.compile(r"^-?\d+(\.\d+)?$")
+
+
+def _literal(text: str) -> Any:
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "'\"":
+        return text[1:-1]
+    if _NUMBER_RE.match(text):
+        return float(text) if "." in text else int(text)
+    return text
+
+
+def _compare(op: str, value: Any, expected: Any) -> bool:
+    if op == "==":
+        return value == expected or str(value) == str(expected)
+    if op == "!=":
+        return not (value == expected or str(value) == str(expected))
+    if op == "~=":
+        # expected为编译路径时已编译好的正则
+        return expected.search(str(value)) is not None
+    if op in ("^=", "$=", "*="):
+        text, pattern = str(value), str(expected)
+        if op == "^=":
+            return text.startswith(pattern)
+        if op == "$=":
+            return text.endswith(pattern)
+        return pattern in text
+    try:
+        value, expected = float(value), float(expected)
+    except (TypeError, ValueError):
+        return False
+    return {">": value > expected, "<": value < expected, ">=": value >= expected, "<=": value <= expected}[op]
+
+
+def _children(node: Any) -> List[Any]:
+    if isinstance(node, dict):
+        return list(node.values())
+    if isinstance(node, list):
+        return node
+    return []
+
+
+class CompiledPath:
+    """
+    编译后的解析路径。
+    """
+
+    def __init__(self, source: str, steps: List[Tuple[str, Any]], pipes: List[Tuple[str, Any]]):
+        self.source = source
+        self.steps = steps
+        self.pipes = pipes
+        # 含通配、切片、过滤或多选时，结果为列表
+        self.multi = any(kind in ("wildcard", "slice", "filter", "multi_index", "multi_key") for kind, _ in steps)
+
+    def __repr__(self) -> str:
+        return f"CompiledPath({self.source!r})"
+
+    @property
+    def key_path(self) -> Optional[List[str]]:
+        """路径只由字典键组成且没有管道时返回键列表，可用于流式解析"""
+        if self.pipes or not self.steps:
+            return None
+        keys = []
+        for kind, arg in self.steps:
+            if kind != "key" or _NUMBER_RE.match(arg):
+                return None
+            keys.append(arg)
+        return keys
+
+    @staticmethod
+    def _apply(kind: str, arg: Any, node: Any) -> List[Any]:
+        """对单个节点执行一步，返回得到的节点列表"""
+        if kind == "key":
+            if isinstance(node, dict) and arg in node:
+                return [node[arg]]
+            # 兼容 a.0.b 的写法
+            if isinstance(node, list) and _NUMBER_RE.match(arg) and "." not in arg:
+                index = int(arg)
+                return [node[index]] if -len(node) <= index < len(node) else []
+            return []
+        if kind == "index":
+            if isinstance(node, list) and -len(node) <= arg < len(node):
+                return [node[arg]]
+            return []
+        if kind == "random":
+            return [random.choice(node)] if isinstance(node, list) and node else []
+        if kind == "wildcard":
+            return _children(node)
+        if kind == "slice":
+            return node[arg] if isinstance(node, list) else []
+        if kind == "multi_index":
+            return [node[i] for i in arg if isinstance(node, list) and -len(node) <= i < len(node)]
+        if kind == "multi_key":
+            return [node[k] for k in arg if isinstance(node, dict) and k in node]
+        if kind == "filter":
+            sub_path, op, expected = arg
+            matched = []
+            for child in _children(node):
+                value = sub_path.evaluate(child) if sub_path else child
+                if value is None:
+                    continue
+                if op is None or _compare(op, value, expected):
+                    matched.append(child)
+            return matched
+        return []
+
+    def evaluate(self, data: Any) -> Any:
+        """
+        对数据求值。
+
+        :param data: 解析后的JSON数据。
+        :return: 单值路径返回值或None；多值路径返回列表（无匹配时为None），经过管道处理后按管道结果返回。
+        """
+        if not self.multi:
+            result = self._evaluate_single(data)
+            if result is None:
+                return None
+            return self._pipe(result) if self.pipes else result
+
+        nodes = [data]
+        for kind, arg in self.steps:
+            next_nodes = []
+            for node in nodes:
+                next_nodes.extend(self._apply(kind, arg, node))
+            nodes = next_nodes
+            if not nodes:
+                return None
+
+        return self._pipe(nodes)
+
+    def _evaluate_single(self, node: Any) -> Any:
+        """单值路径的快速求值，不构建中间列表"""
+        for kind, arg in self.steps:
+            if kind == "key":
+                if isinstance(node, dict):
+                    node = node.get(arg)
+                else:
+                    found = self._apply(kind, arg, node)
+                    node = found[0] if found else None
+            elif kind == "index":
+                node = node[arg] if isinstance(node, list) and -len(node) <= arg < len(node) else None
+            else:
+                node = random.choice(node) if isinstance(node, list) and node else None
+            if node is None:
+                return None
+        return node
+
+    def _pipe(self, result: Any) -> Any:
+        for name, arg in self.pipes:
+            values = result if isinstance(result, list) else [result]
+            if not values:
+                return None
+            if name == "random":
+                result = random.choice(values)
+            elif name == "first":
+                result = values[0]
+            elif name == "last":
+                result = values[-1]
+            elif name == "join":
+                result = arg.join(str(v) for v in values if v is not None)
+        return result
+
+
+def _split_brackets(source: str) -> List[str]:
+    """把路径拆成片段，跳过引号与中括号内的分隔符"""
+    parts, current, depth, quote = [], "", 0, ""
+    for ch in source:
+        if quote:
+            current += ch
+            if ch == quote:
+                quote = ""
+            continue
+        if ch in "'\"" and depth:
+            quote = ch
+        elif ch == "[":
+            if depth == 0 and current:
+                parts.append(current)
+                current = ""
+            depth += 1
+        elif ch == "]":
+            depth -= 1
+            if depth == 0:
+                parts.append(current + ch)
+                current = ""
+                continue
+        elif ch == "." and depth == 0:
+            if current:
+                parts.append(current)
+            current = ""
+            continue
+        current += ch
+    if depth or quote:
+        raise ValueError(f"解析路径的括号或引号不匹配: {source}")
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _split_top(text: str, sep: str) -> List[str]:
+    """按分隔符拆分，忽略引号内的分隔符"""
+    parts, current, quote = [], "", ""
+    for ch in text:
+        if quote:
+            quote = "" if ch == quote else quote
+        elif ch in "'\"":
+            quote = ch
+        elif ch == sep:
+            parts.append(current)
+            current = ""
+            continue
+        current += ch
+    parts.append(current)
+    return parts
+
+
+def _compile_bracket(inner: str) -> Tuple[str, Any]:
+    inner = inner.strip()
+    if inner == "":
+        return "random", None
+    if inner == "*":
+        return "wildcard", None
+    if inner.startswith("?"):
+        match = _FILTER_RE.match(inner[1:])
+        field, op, value = match.groups()
+        field = field.strip()
+        sub_path = compile_path(field) if field else None
+        expected = _literal(value) if op else None
+        if op == "~=":
+            try:
+                expected = re.compile(str(expected))
+            except re.error as e:
+                raise ValueError(f"过滤条件中的正则表达式无效: [{inner}] {e}")
+        return "filter", (sub_path, op, expected)
+    if ":" in inner and inner[0] not in "'\"":
+        bounds = [int(b) if b.strip() else None for b in inner.split(":")]
+        if len(bounds) > 3:
+            raise ValueError(f"切片格式错误: [{inner}]")
+        return "slice", slice(*bounds)
+    items = [item.strip() for item in _split_top(inner, ",")]
+    if len(items) > 1:
+        if all(_NUMBER_RE.match(item) for item in items):
+            return "multi_index", [int(item) for item in items]
+        return "multi_key", [str(_literal(item)) for item in items]
+    if _NUMBER_RE.match(inner):
+        return "index", int(inner)
+    return "key", str(_literal(inner))
+
+
+@lru_cache(maxsize=4096)
+def compile_path(source: str) -> CompiledPath:
+    """
+    编译解析路径，结果会被缓存。
+
+    :param source: 解析路径字符串。
+    :return: 编译后的路径。
+    :raises ValueError: 路径格式错误。
+    """
+    path_part, *pipe_parts = _split_top(source, "|")
+    steps: List[Tuple[str, Any]] = []
+    for part in _split_brackets(path_part.strip()):
+        part = part.strip()
+        if not part:
+            continue
+        if part.startswith("["):
+            steps.append(_compile_bracket(part[1:-1]))
+        elif part == "*":
+            steps.append(("wildcard", None))
+        else:
+            steps.append(("key", part))
+
+    pipes: List[Tuple[str, Any]] = []
+    for pipe in pipe_parts:
+        pipe = pipe.strip()
+        name, _, arg = pipe.partition("(")
+        if name not in ("random", "first", "last", "join"):
+            raise ValueError(f"未知的管道: {pipe}")
+        sep = "\n"
+        if arg:
+            sep = arg[:-1] if arg.endswith(")") else arg
+            sep = _literal(sep) if sep else sep
+            sep = sep.replace("\\n", "\n") if isinstance(sep, str) else str(sep)
+        pipes.append((name, sep))
+    return CompiledPath(source, steps, pipes)
+
+
+def extract(data: Any, target: str) -> Any:
+    """按解析路径取值，路径无效时返回None"""
+    try:
+        return compile_path(target).evaluate(data)
+    except ValueError:
+        return None
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import random
+import threading
+from pathlib import Path
+from typing import List, Optional, Set
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+class TextStore:
+    """
+    单个文本API的追加式历史记录，每行一条JSON字符串。
+    内存中保存条目摘要集合用于O(1)去重，以及每行的偏移量用于随机读取。
+    """
+
+    def __init__(self, path: Path):
+        """
+        初始化TextStore，首次访问时才加载索引。
+
+        :param path: jsonl 文件路径，同名的旧版 .json 文件会被自动迁移。
+        """
+        self.path = path
+        self.legacy_path = path.with_suffix(".json")
+        self._lock = threading.Lock()
+        self._digests: Set[bytes] = set()
+        self._offsets: List[int] = []
+        self._size = 0
+        self._loaded = False
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._offsets)
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        if not self.path.exists() and self.legacy_path.exists():
+            self._migrate_legacy()
+        if self._scan():
+            # 存在损坏的行（如写入中断），重写文件
+            self._compact_locked()
+        self._loaded = True
+
+    def _migrate_legacy(self) -> None:
+        """将旧版整体JSON列表转换为jsonl"""
+        try:
+            history = json.loads(self.legacy_path.read_text("utf-8"))
+        except (json.JSONDecodeError, OSError):
+            history = []
+        self._write_all([str(text) for text in history if text is not None])
+        self.legacy_path.unlink(missing_ok=True)
+
+    def _scan(self) -> bool:
+        """
+        扫描文件重建索引。
+
+        :return: 文件中是否存在重复或损坏的行。
+        """
+        self._digests.clear()
+        self._offsets.clear()
+        self._size = 0
+        dirty = False
+        if not self.path.exists():
+            return dirty
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                try:
+                    text = json.loads(line)
+                    digest = _digest(text)
+                except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
+                    dirty = True
+                else:
+                    if digest in self._digests or not line.endswith(b"\n"):
+                        dirty = True
+                    else:
+                        self._digests.add(digest)
+                        self._offsets.append(offset)
+                offset += len(line)
+            self._size = offset
+        return dirty
+
+    def _write_all(self, texts: List[str]) -> None:
+        """通过临时文件原子地重写全部条目（去重）"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".jsonl.tmp")
+        seen: Set[bytes] = set()
+        with open(tmp_path, "wb") as f:
+            for text in texts:
+                digest = _digest(text)
+                if digest in seen:
+                    continue
+                seen.add(digest)
+                f.write(json.dumps(text, ensure_ascii=False).encode("utf-8") + b"\n")
+        os.replace(tmp_path, self.path)
+
+    def _read_at(self, f, offset: int) -> Optional[str]:
+        f.seek(offset)
+        try:
+            return json.loads(f.readline())
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None
+
+    def _compact_locked(self) -> None:
+        texts = []
+        if self.path.exists():
+            with open(self.path, "rb") as f:
+                for line in f:
+                    try:
+                        text = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        continue
+                    if isinstance(text, str) and line.endswith(b"\n"):
+                        texts.append(text)
+        self._write_all(texts)
+        self._scan()
+
+    def append(self, text: str) -> bool:
+        """
+        追加一条文本，已存在时忽略。
+
+        :param text: 文本内容。
+        :return: 是否新增了条目。
+        """
+        digest = _digest(text)
+        with self._lock:
+            self._ensure_loaded()
+            if digest in self._digests:
+                return False
+            line = json.dumps(text, ensure_ascii=False).encode("utf-8") + b"\n"
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(line)
+            self._digests.add(digest)
+            self._offsets.append(self._size)
+            self._size += len(line)
+            return True
+
+    def random(self) -> Optional[str]:
+        """
+        随机读取一条文本，只读取对应的一行。
+
+        :return: 文本内容，没有记录时返回None。
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if not self._offsets:
+                return None
+            with open(self.path, "rb") as f:
+                return self._read_at(f, random.choice(self._offsets))
+
+    def compact(self) -> None:
+        """重写文件，去除重复与损坏的行"""
+        with self._lock:
+            self._compact_locked()
+            self._loaded = True
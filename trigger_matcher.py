@@ -0,0 +1,106 @@
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+_END = ""  # 终止标记，空字符串不会与任何单个字符冲突
+
+
+def _is_word_char(ch: str) -> bool:
+    """ASCII字母数字视为单词字符，用于避免 'kfc' 命中 'kfcdeal'"""
+    return ch.isascii() and ch.isalnum()
+
+
+class TriggerTrie:
+    """
+    触发词前缀树，在一次扫描中找出消息开头最长的触发词。
+    """
+
+    def __init__(self, words: Optional[Iterable[Tuple[str, Any]]] = None):
+        """
+        初始化TriggerTrie。
+
+        :param words: 可选的 (触发词, 值) 序列。
+        """
+        self.root: Dict[str, Any] = {}
+        self.size = 0
+        for word, value in words or ():
+            self.insert(word, value)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def insert(self, word: str, value: Any) -> None:
+        """
+        插入一个触发词，已存在时覆盖其值。
+
+        :param word: 触发词。
+        :param value: 命中时返回的值。
+        """
+        if not word:
+            return
+        node = self.root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        if _END not in node:
+            self.size += 1
+        node[_END] = value
+
+    def remove(self, word: str) -> None:
+        """
+        删除一个触发词，并清理不再使用的节点。
+
+        :param word: 触发词。
+        """
+        path = []
+        node = self.root
+        for ch in word:
+            if ch not in node:
+                return
+            path.append((node, ch))
+            node = node[ch]
+        if node.pop(_END, None) is None:
+            return
+        self.size -= 1
+        for parent, ch in reversed(path):
+            if parent[ch]:
+                break
+            del parent[ch]
+
+    def get(self, word: str) -> Optional[Any]:
+        """
+        精确查找触发词。
+
+        :param word: 触发词。
+        :return: 触发词对应的值，不存在则返回None。
+        """
+        node = self.root
+        for ch in word:
+            node = node.get(ch)
+            if node is None:
+                return None
+        return node.get(_END)
+
+    def longest_prefix(self, text: str, boundary: bool = False) -> Optional[Tuple[Any, int]]:
+        """
+        查找text开头最长的触发词。
+
+        :param text: 待匹配的文本。
+        :param boundary: 为True时，以ASCII字母数字结尾的触发词后面不能紧跟ASCII字母数字。
+        :return: (值, 触发词长度)，未命中则返回None。
+        """
+        node = self.root
+        candidates = []
+        for i, ch in enumerate(text):
+            node = node.get(ch)
+            if node is None:
+                break
+            if _END in node:
+                candidates.append((node[_END], i + 1))
+        for value, end in reversed(candidates):
+            if (
+                boundary
+                and end < len(text)
+                and _is_word_char(text[end - 1])
+                and _is_word_char(text[end])
+            ):
+                continue
+            return value, end
+        return None
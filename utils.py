@@ -1,8 +1,9 @@
 import re
-import random
 from typing import Any, Optional, Dict
 from urllib.parse import unquote, urlparse
 
+import data.plugins.astrbot_plugin_customize.target_path as target_path
+
 def parse_params_str(params_str: str) -> dict:
     """解析参数字符串为字典"""
     params = {}
@@ -15,36 +16,42 @@ def parse_params_str(params_str: str) -> dict:
                 params[key_value[0].strip()] = None
     return params
 
+# 中文字段名 -> API信息的键
+API_FIELDS = {
+    "名称": "name", "地址": "url", "类型": "type", "参数": "params",
+    "解析路径": "target", "别名": "aliases", "缓存时间": "cache_ttl", "缓存配额": "disk_quota_mb",
+    "限流": "rate_limit", "镜像": "mirrors", "组合": "apis",
+}
+LIST_FIELDS = ("aliases", "mirrors", "apis")
+INT_FIELDS = ("cache_ttl", "disk_quota_mb", "rate_limit")
+
+def coerce_api_field(key_en: str, value: str) -> Any:
+    """把字符串形式的字段值转换为API信息中的类型，空值返回None"""
+    value = value.strip()
+    if key_en == "params":
+        return parse_params_str(value)
+    if key_en in LIST_FIELDS:
+        return [a.strip() for a in re.split(r"[,，]", value) if a.strip()]
+    if key_en in INT_FIELDS:
+        return int(value) if value.isdigit() else 0
+    return value or None
+
 def parse_api_input(input_str: str) -> Dict[str, Any]:
     """从字符串解析API信息"""
-    info_map = {"名称": "name", "地址": "url", "类型": "type", "参数": "params", "解析路径": "target"}
     api_info = {}
-    parts = re.split(r'\s*(名称|地址|类型|参数|解析路径)：', '名称：' + input_str)
+    parts = re.split(r'\s*(' + "|".join(API_FIELDS) + r')：', '名称：' + input_str)
     
     it = iter(parts[1:])
     for key_zh in it:
-        key_en = info_map.get(key_zh)
-        value = next(it, "").strip()
-        if key_en == "params":
-            api_info[key_en] = parse_params_str(value)
-        elif value:
+        key_en = API_FIELDS.get(key_zh)
+        value = coerce_api_field(key_en, next(it, ""))
+        if value is not None:
             api_info[key_en] = value
     return api_info
 
 def get_nested_value(result: dict, target: str) -> Any:
-    """安全地从嵌套字典中获取值"""
-    try:
-        keys = re.split(r'\.|(\[\d*\])', target)
-        keys = [k.strip("[]") for k in keys if k and k.strip()]
-        value = result
-        for key in keys:
-            if isinstance(value, list):
-                value = random.choice(value) if key == "" else value[int(key)]
-            else:
-                value = value.get(key)
-        return value
-    except (KeyError, IndexError, TypeError, ValueError):
-        return None
+    """安全地从嵌套字典中获取值，路径语法见 target_path"""
+    return target_path.extract(result, target)
 
 def extract_url(text: str) -> Optional[str]:
     """从字符串中提取第一个有效URL"""